@@ -267,7 +267,7 @@ async def get_case_detail(
     # Get messages
     messages = db.query(db_models.Message).filter(
       db_models.Message.session_id == session_id
-    ).order_by(db_models.Message.created_at).all()
+    ).order_by(db_models.Message.seq).all()
 
     conversation = [
       {"role": msg.role, "content": msg.content, "created_at": msg.created_at.isoformat()}
@@ -215,7 +215,7 @@ async def start_case(
 
   if user and is_db_configured():
     persistence = get_case_persistence()
-    persistence.save_session(case_state, user_id=str(user.id))
+    await persistence.save_session(case_state, user_id=str(user.id))
 
   # Get images appropriate for intro phase
   images = _get_images_for_phase(condition_info, case_state.phase)
@@ -270,7 +270,7 @@ async def send_message(
 
   if user and is_db_configured():
     persistence = get_case_persistence()
-    persistence.save_session(updated_state, user_id=str(user.id))
+    await persistence.save_session(updated_state, user_id=str(user.id))
 
   # Get images appropriate for current phase
   images = _get_images_for_phase(condition_info, updated_state.phase)
@@ -322,7 +322,7 @@ async def get_debrief(
 
   if user and is_db_configured():
     persistence = get_case_persistence()
-    persistence.complete_session(
+    await persistence.complete_session(
       case_state,
       debrief_summary=debrief.summary,
       user_id=str(user.id),
@@ -496,7 +496,7 @@ async def get_history(
   """
   if user and is_db_configured():
     persistence = get_case_persistence()
-    cases = persistence.get_user_history(str(user.id), status="completed")
+    cases = await persistence.get_user_history(str(user.id), status="completed")
     return CaseHistoryResponse(
       cases=cases,
       total_count=len(cases),
@@ -519,7 +519,7 @@ async def get_case_detail(
   """Get full details of a specific completed case."""
   if user and is_db_configured():
     persistence = get_case_persistence()
-    export = persistence.get_case_export(session_id, user_id=str(user.id))
+    export = await persistence.get_case_export(session_id, user_id=str(user.id))
     if export:
       return export
 
@@ -541,7 +541,7 @@ async def get_active_cases(
     return CaseHistoryResponse(cases=[], total_count=0)
 
   persistence = get_case_persistence()
-  cases = persistence.get_user_history(str(user.id), status="active")
+  cases = await persistence.get_user_history(str(user.id), status="active")
   return CaseHistoryResponse(
     cases=cases,
     total_count=len(cases),
@@ -558,7 +558,7 @@ async def get_case_by_id(
     raise HTTPException(status_code=404, detail="Case not found")
 
   persistence = get_case_persistence()
-  case_data = persistence.get_session_with_state(session_id, user_id=str(user.id))
+  case_data = await persistence.get_session_with_state(session_id, user_id=str(user.id))
 
   if not case_data:
     raise HTTPException(status_code=404, detail="Case not found")
@@ -597,7 +597,7 @@ async def get_case_debrief(
   # Try database first
   if user and is_db_configured():
     persistence = get_case_persistence()
-    export = persistence.get_case_export(session_id, user_id=str(user.id))
+    export = await persistence.get_case_export(session_id, user_id=str(user.id))
     if export:
       patient = export.patient_summary
       learning = export.learning_materials
@@ -658,7 +658,7 @@ async def ask_post_debrief_question(
 
   if user and is_db_configured():
     persistence = get_case_persistence()
-    export = persistence.get_case_export(session_id, user_id=str(user.id))
+    export = await persistence.get_case_export(session_id, user_id=str(user.id))
 
   if not export:
     history = get_case_history()
@@ -39,6 +39,10 @@ class Settings(BaseSettings):
   # Claude
   claude_model: str = "claude-sonnet-4-5-20250929"
 
+  # LLM response cache (Redis preferred when set; empty path disables SQLite)
+  redis_url: str = ""
+  llm_cache_path: str = "~/.echo/llm_cache.db"
+
   # Server
   echo_host: str = "0.0.0.0"
   echo_port: int = 9101
@@ -0,0 +1,110 @@
+"""Shared key/value backends for Echo's LLM response caches.
+
+In-process caches are lost on every worker restart and aren't shared between
+uvicorn workers. These backends give the caches a store that survives both:
+SQLite (stdlib, default) for single-host deploys, or Redis when REDIS_URL is
+set and the ``redis`` package is installed.
+"""
+
+from contextlib import closing
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Protocol
+import asyncio
+import sqlite3
+import time
+
+from ..config import get_settings
+
+
+class CacheBackend(Protocol):
+  """Minimal byte-oriented key/value store with expiry."""
+
+  async def get(self, key: str) -> Optional[bytes]:
+    """Return the stored value, or None if missing or expired."""
+    ...
+
+  async def setex(self, key: str, ttl_seconds: int, value: bytes) -> None:
+    """Store a value that expires after ttl_seconds."""
+    ...
+
+
+class SQLiteBackend:
+  """Cache backend on a local SQLite file, safe across worker processes.
+
+  sqlite3 is blocking (up to its lock timeout), so queries run in a worker
+  thread, each on its own short-lived connection.
+  """
+
+  def __init__(self, path: str):
+    self.path = Path(path).expanduser()
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self._execute(
+      "CREATE TABLE IF NOT EXISTS cache ("
+      "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+    )
+
+  def _execute(self, *statements: tuple) -> Optional[tuple]:
+    """Run statements in one transaction; return the last one's first row."""
+    with closing(sqlite3.connect(self.path, timeout=5.0)) as conn, conn:
+      row = None
+      for statement in statements:
+        if isinstance(statement, str):
+          statement = (statement,)
+        row = conn.execute(*statement).fetchone()
+      return row
+
+  async def get(self, key: str) -> Optional[bytes]:
+    row = await asyncio.to_thread(
+      self._execute,
+      ("SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())),
+    )
+    return row[0] if row else None
+
+  async def setex(self, key: str, ttl_seconds: int, value: bytes) -> None:
+    now = time.time()
+    # Writes also purge expired rows, so the file doesn't grow without bound
+    await asyncio.to_thread(
+      self._execute,
+      ("DELETE FROM cache WHERE expires_at < ?", (now,)),
+      (
+        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+        (key, value, now + ttl_seconds),
+      ),
+    )
+
+
+class RedisBackend:
+  """Cache backend on Redis, shared by every worker and host."""
+
+  def __init__(self, url: str):
+    import redis.asyncio  # Optional dependency, only needed when REDIS_URL is set
+
+    self.client = redis.asyncio.Redis.from_url(url)
+
+  async def get(self, key: str) -> Optional[bytes]:
+    return await self.client.get(key)
+
+  async def setex(self, key: str, ttl_seconds: int, value: bytes) -> None:
+    await self.client.setex(key, ttl_seconds, value)
+
+
+@lru_cache
+def get_cache_backend() -> Optional[CacheBackend]:
+  """Get the configured cache backend (Redis > SQLite > none).
+
+  A backend that can't be set up (e.g. a read-only home directory) leaves
+  the caches in-memory only rather than failing requests.
+  """
+  settings = get_settings()
+  if settings.redis_url:
+    try:
+      return RedisBackend(settings.redis_url)
+    except ImportError:
+      print("WARN: REDIS_URL set but redis package not installed; using SQLite cache.")
+  if settings.llm_cache_path:
+    try:
+      return SQLiteBackend(settings.llm_cache_path)
+    except (OSError, sqlite3.Error) as e:
+      print(f"WARN: SQLite cache unavailable ({e}); caching in memory only.")
+  return None
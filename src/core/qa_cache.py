@@ -0,0 +1,139 @@
+"""Per-case answer cache for post-debrief Q&A.
+
+Learners often re-ask the same follow-up with different casing, punctuation,
+or filler ("Why did we pick amoxicillin?" / "why did we pick the
+amoxicillin"). Answers are cached per case under the normalized question,
+so a repeat returns the earlier answer without another Claude call.
+
+Matching is exact after normalization: word order and every content word
+(including "not") are kept, since a near-miss can mean the opposite. The key
+also carries a digest of the previous Q&A the answer was generated with, so
+context-dependent follow-ups ("why?", "explain more") only hit when asked
+after the same exchange.
+
+Entries are kept in memory and, when a backend is configured, written through
+(zlib-compressed JSON) so other workers and restarts can reuse them.
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+import hashlib
+import json
+import re
+import zlib
+
+from .cache_backend import CacheBackend, get_cache_backend
+
+
+# Bounds so a long-running worker can't grow without limit
+MAX_CASES = 256
+MAX_ENTRIES_PER_CASE = 32
+
+# How the prompt sees previous Q&A; only these pairs shape the answer
+PREVIOUS_QA_WINDOW = 5
+
+# How long a case's answers live in the shared backend
+BACKEND_TTL_SECONDS = 7 * 24 * 3600
+
+# Backend key prefix; bumped when the entry format changed from similarity
+# vectors to exact keys, so old rows are never read
+BACKEND_KEY_PREFIX = "qa:v2:"
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Filler words that never change what is being asked
+_FILLER = frozenset({"a", "an", "the", "please", "just", "so"})
+
+
+def question_key(question: str, previous_qa: Optional[list[dict]] = None) -> str:
+  """Cache key for a question: its normalized words, in order, plus its context."""
+  words = " ".join(w for w in _WORD_RE.findall(question.lower()) if w not in _FILLER)
+  if not previous_qa:
+    return words
+  context = json.dumps(previous_qa[-PREVIOUS_QA_WINDOW:], sort_keys=True, default=str)
+  return f"{words}|{hashlib.sha1(context.encode()).hexdigest()[:16]}"
+
+
+class QACache:
+  """Per-case cache of post-debrief answers, optionally backend-persisted."""
+
+  def __init__(self, backend: Optional[CacheBackend] = None):
+    self.backend = backend
+    # case_id -> {question key: answer}, oldest first
+    self._cases: OrderedDict[str, OrderedDict[str, dict]] = OrderedDict()
+
+  async def get(
+    self,
+    case_id: str,
+    question: str,
+    previous_qa: Optional[list[dict]] = None,
+  ) -> Optional[dict]:
+    """Return the cached answer to this question, asked after this Q&A, if any."""
+    entries = await self._load(case_id)
+    if not entries:
+      return None
+    return entries.get(question_key(question, previous_qa))
+
+  async def put(
+    self,
+    case_id: str,
+    question: str,
+    answer: dict,
+    previous_qa: Optional[list[dict]] = None,
+  ) -> None:
+    """Cache an answer for a question on this case."""
+    entries = await self._load(case_id)
+    if entries is None:
+      entries = self._remember(case_id, OrderedDict())
+    entries[question_key(question, previous_qa)] = answer
+    if len(entries) > MAX_ENTRIES_PER_CASE:
+      entries.popitem(last=False)
+    await self._store(case_id, entries)
+
+  def clear(self) -> None:
+    """Clear in-memory cached answers (for testing)."""
+    self._cases.clear()
+
+  def _remember(self, case_id: str, entries: OrderedDict) -> OrderedDict:
+    """Track a case's entries in memory, evicting the least recent case."""
+    self._cases[case_id] = entries
+    self._cases.move_to_end(case_id)
+    if len(self._cases) > MAX_CASES:
+      self._cases.popitem(last=False)
+    return entries
+
+  async def _load(self, case_id: str) -> Optional[OrderedDict]:
+    """Get a case's entries from memory, falling back to the backend."""
+    entries = self._cases.get(case_id)
+    if entries is not None:
+      self._cases.move_to_end(case_id)
+      return entries
+    if self.backend is None:
+      return None
+
+    try:
+      raw = await self.backend.get(f"{BACKEND_KEY_PREFIX}{case_id}")
+      if not raw:
+        return None
+      stored = json.loads(zlib.decompress(raw))
+    except Exception as e:
+      print(f"Error reading Q&A cache: {e}")
+      return None
+    return self._remember(case_id, OrderedDict(stored))
+
+  async def _store(self, case_id: str, entries: OrderedDict) -> None:
+    """Write a case's entries through to the backend."""
+    if self.backend is None:
+      return
+    payload = zlib.compress(json.dumps(list(entries.items())).encode())
+    try:
+      await self.backend.setex(f"{BACKEND_KEY_PREFIX}{case_id}", BACKEND_TTL_SECONDS, payload)
+    except Exception as e:
+      print(f"Error writing Q&A cache: {e}")
+
+
+@lru_cache
+def get_qa_cache() -> QACache:
+  """Get the Q&A cache singleton, backed by the configured shared store."""
+  return QACache(backend=get_cache_backend())
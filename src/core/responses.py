@@ -0,0 +1,20 @@
+"""JSON responses that skip FastAPI's response_model re-validation."""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class OrjsonResponse(JSONResponse):
+  """JSON response serialized by pydantic-core (models) or orjson (anything else).
+
+  Returning one from a route bypasses FastAPI's validate + jsonable_encoder +
+  json.dumps pass; keep response_model on the decorator for the OpenAPI schema.
+  """
+
+  def render(self, content: Any) -> bytes:
+    if isinstance(content, BaseModel):
+      return content.__pydantic_serializer__.to_json(content, by_alias=True)
+    return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC, default=str)
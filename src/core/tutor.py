@@ -1,9 +1,13 @@
 """Core tutor logic using Claude."""
 
 from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Iterator, Optional, TypeVar, Union
+from pydantic import BaseModel, TypeAdapter, ValidationError
 import anthropic
+import asyncio
+import httpx
 import json
 import re
 
@@ -14,99 +18,253 @@ from ..models.feedback import (
   QuestionRequest, QuestionResponse,
   DebriefRequest, DebriefResponse,
 )
-
-# Import these at the module level for type hints, but actual classes imported later
-from typing import TYPE_CHECKING
-if TYPE_CHECKING:
-  from ..cases.models import CaseState, CasePhase, DescribeCaseState, DescribedCase
+from ..cases.models import (
+  CaseState, CasePhase, VisitType,
+  DescribeCaseState, DescribeCasePhase, DescribedCase,
+)
+from .citations import get_citation_search
+from .qa_cache import get_qa_cache
 
 
 # Prompts directory
 PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
 
 
+# Shared connection pool for Anthropic calls. Tutor is constructed per request
+# in the case routes, so pooling at module level keeps TLS connections warm
+# across requests instead of per Tutor instance.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_anthropic_http_client() -> httpx.AsyncClient:
+  """Get or create the shared HTTP/2 keep-alive client for Anthropic."""
+  global _http_client
+  if _http_client is None or _http_client.is_closed:
+    _http_client = anthropic.DefaultAsyncHttpxClient(
+      http2=True,
+      limits=httpx.Limits(
+        max_connections=100,
+        max_keepalive_connections=50,
+        keepalive_expiry=30.0,
+      ),
+      timeout=httpx.Timeout(120.0, connect=5.0),
+    )
+  return _http_client
+
+
+async def close_anthropic_http_client() -> None:
+  """Close the shared Anthropic HTTP client (on app shutdown).
+
+  The cached Tutor holds the closed client, so it is dropped too; the next
+  get_tutor() builds one on a fresh client.
+  """
+  global _http_client
+  if _http_client is not None:
+    await _http_client.aclose()
+    _http_client = None
+  get_tutor.cache_clear()
+
+
+# Prompt templates, read once at import
+_PROMPTS: dict[str, str] = {p.stem: p.read_text() for p in PROMPTS_DIR.glob("*.md")}
+
+
 def load_prompt(name: str) -> str:
-  """Load a prompt template from the prompts directory."""
-  path = PROMPTS_DIR / f"{name}.md"
-  if not path.exists():
-    raise FileNotFoundError(f"Prompt file not found: {path}")
-  return path.read_text()
+  """Get a prompt template from the prompts directory."""
+  try:
+    return _PROMPTS[name]
+  except KeyError:
+    raise FileNotFoundError(f"Prompt file not found: {PROMPTS_DIR / f'{name}.md'}") from None
 
 
-@lru_cache
 def get_system_prompt() -> str:
-  """Load and cache the system prompt."""
-  return load_prompt("system")
+  """Get the system prompt."""
+  return _PROMPTS["system"]
 
 
-@lru_cache
 def get_well_child_prompt() -> str:
-  """Load and cache the well-child teaching prompt."""
-  return load_prompt("well_child")
+  """Get the well-child teaching prompt."""
+  return _PROMPTS["well_child"]
 
 
-@lru_cache
 def get_well_child_debrief_prompt() -> str:
-  """Load and cache the well-child debrief prompt."""
-  return load_prompt("well_child_debrief")
+  """Get the well-child debrief prompt."""
+  return _PROMPTS["well_child_debrief"]
+
+
+# Markdown code fences Claude sometimes wraps JSON responses in
+_LEADING_FENCE = re.compile(r'^```(?:json)?\s*\n?')
+_TRAILING_FENCE = re.compile(r'\n?```\s*$')
 
 
 def clean_json_response(text: str) -> str:
   """Strip markdown code blocks from LLM response."""
-  text = re.sub(r'^```(?:json)?\s*\n?', '', text.strip())
-  text = re.sub(r'\n?```\s*$', '', text.strip())
+  text = _LEADING_FENCE.sub('', text.strip())
+  text = _TRAILING_FENCE.sub('', text)
   return text.strip()
 
 
-def format_patient_context(patient: PatientContext) -> str:
-  """Format patient context for the prompt."""
-  lines = [
-    f"PATIENT: {patient.name}, {patient.age_display}, {patient.sex or 'sex unknown'}",
-    f"Source: {patient.source}",
-  ]
+def _extract_json_object(text: str) -> Optional[str]:
+  """Find the first balanced {...} object in text, ignoring braces in strings."""
+  start = text.find("{")
+  if start == -1:
+    return None
 
-  if patient.problem_list:
-    active = [c.display_name for c in patient.problem_list if c.is_active]
-    if active:
-      lines.append(f"Active Problems: {', '.join(active)}")
+  depth = 0
+  in_string = False
+  escaped = False
+  for i in range(start, len(text)):
+    ch = text[i]
+    if in_string:
+      if escaped:
+        escaped = False
+      elif ch == "\\":
+        escaped = True
+      elif ch == '"':
+        in_string = False
+    elif ch == '"':
+      in_string = True
+    elif ch == "{":
+      depth += 1
+    elif ch == "}":
+      depth -= 1
+      if depth == 0:
+        return text[start:i + 1]
+  return None
+
+
+def parse_json_response(text: str):
+  """Parse JSON from an LLM response.
+
+  Tries the raw text first, since Claude usually follows the "no code blocks"
+  instruction, then with markdown fences stripped, then the first balanced
+  {...} object (for replies wrapped in prose). Raises json.JSONDecodeError if
+  none of those parse.
+  """
+  try:
+    return json.loads(text)
+  except json.JSONDecodeError:
+    pass
+  try:
+    return json.loads(clean_json_response(text))
+  except json.JSONDecodeError:
+    obj = _extract_json_object(text)
+    if obj is None:
+      raise
+    return json.loads(obj)
+
+
+T = TypeVar("T", bound=BaseModel)
+
+
+# Validators for the endpoint responses, built once instead of per parse
+_FEEDBACK_ADAPTER = TypeAdapter(FeedbackResponse)
+_QUESTION_ADAPTER = TypeAdapter(QuestionResponse)
+_DEBRIEF_ADAPTER = TypeAdapter(DebriefResponse)
+
+
+def _parse_response(text: str, adapter: TypeAdapter[T], fallback: Callable[[str], T]) -> T:
+  """Parse a JSON reply with adapter, or build the plain-text fallback.
+
+  Replies that aren't JSON, or are JSON of the wrong shape, fall back.
+  """
+  try:
+    return adapter.validate_python(parse_json_response(text))
+  except (json.JSONDecodeError, ValidationError):
+    return fallback(text)
+
+
+def _bullets(items) -> str:
+  """Render items as a markdown bullet list, one per line."""
+  return "\n".join(map("- {}".format, items))
+
+
+# Rough chars-per-token ratio for English prose; good enough for budgeting
+# without a tokenizer round-trip.
+CHARS_PER_TOKEN = 4
+
+# How often to poll a Message Batch for completion
+BATCH_POLL_INTERVAL_SECONDS = 10
+
+# Cap on concurrent Claude calls when grading a whole cohort at once
+MAX_CONCURRENT_REQUESTS = 8
+
+# Token budget for the transcript excerpt in post-debrief Q&A prompts
+TRANSCRIPT_TOKEN_BUDGET = 800
+
+
+def estimate_tokens(text: str) -> int:
+  """Cheap local estimate of the token count for a piece of text."""
+  return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _pack_conversation(messages: list[dict], budget_tokens: int = TRANSCRIPT_TOKEN_BUDGET) -> list[str]:
+  """Summarize the most recent transcript messages that fit in a token budget.
+
+  Walks the transcript newest-first, formatting each message as a
+  ``Role: content...`` line (content capped at 200 chars), and stops once
+  the next line would exceed the budget. Returns lines in chronological order.
+  """
+  lines = []
+  used = 0
+  for msg in reversed(messages):
+    role = "Learner" if msg.get("role") == "user" else "Echo"
+    line = f"{role}: {msg.get('content', '')[:200]}..."
+    cost = estimate_tokens(line)
+    if used + cost > budget_tokens:
+      break
+    lines.append(line)
+    used += cost
+  lines.reverse()
+  return lines
+
+
+# Static prompt fragments shared across calls (assembled with "".join)
+_WELL_CHILD_JSON_SKELETON = """## Response Format
+Return valid JSON only:
+{"summary": "2-3 sentences", "strengths": ["specific strengths"], "areas_for_improvement": ["specific areas"], "missed_items": ["what was missed"], "teaching_points": ["1-3 pearls"], "follow_up_resources": ["optional resources"], "well_child_scores": {"growth_interpretation": {"score": 0, "feedback": "specific feedback"}, "milestone_assessment": {"score": 0, "feedback": "..."}, "exam_thoroughness": {"score": 0, "feedback": "..."}, "anticipatory_guidance": {"score": 0, "feedback": "..."}, "immunization_knowledge": {"score": 0, "feedback": "..."}, "communication_skill": {"score": 0, "feedback": "..."}}}"""
 
-  if patient.medication_list:
-    meds = [m.display_name for m in patient.medication_list if m.is_active]
-    if meds:
-      lines.append(f"Medications: {', '.join(meds)}")
+_DEBRIEF_INSTRUCTIONS = """## Instructions
 
-  if patient.allergy_list:
-    allergies = [f"{a.display_name} ({a.reaction})" if a.reaction else a.display_name
-                 for a in patient.allergy_list]
-    lines.append(f"ALLERGIES: {', '.join(allergies)}")
+Provide a warm, encouraging debrief that helps them learn and grow.
 
-  if patient.recent_encounters:
-    enc = patient.recent_encounters[0]
-    lines.append(f"Last visit: {enc.date} - {enc.chief_complaint}")
+Be specific:
+- Reference actual things they said/did
+- Explain WHY things matter, not just THAT they're important
+- Share 1-2 clinical pearls they can use next time
+- End the summary with a brief check-in
 
-  return "\n".join(lines)
+"""
 
+_DEBRIEF_JSON_SKELETON = """## Response Format
 
-class Tutor:
-  """Claude-powered medical tutor."""
+Return valid JSON only. No markdown, no code blocks:
 
-  def __init__(self, api_key: str = None, model: str = None):
-    settings = get_settings()
-    self.client = anthropic.Anthropic(api_key=api_key or settings.anthropic_api_key)
-    self.model = model or settings.claude_model
-    self.system_prompt = get_system_prompt()
+{"summary": "2-3 sentences capturing how the encounter went overall. End with a brief check-in: 'How did that feel?' or 'Anything you want to talk through?'", "strengths": ["Specific things done well - reference actual actions from the conversation"], "areas_for_improvement": ["Specific areas to work on - explain why it matters for patient care"], "missed_items": ["Things that should have been caught - if any, otherwise empty array"], "teaching_points": ["1-3 clinical pearls from this case that they can apply next time"], "follow_up_resources": ["Optional: relevant guidelines or resources - can be empty array"]}"""
+
+_POST_DEBRIEF_INSTRUCTIONS = """## Your Task
+Answer their question helpfully. You have full context of what happened in the case.
+
+Guidelines:
+- Be specific - reference what actually happened in the case
+- If they're asking "why", explain the clinical reasoning
+- If they're asking about alternatives, discuss trade-offs
+- Keep it conversational, not lecture-y
+- If the question relates to teaching points, reinforce them
+
+## Response Format
+Return valid JSON only:
+{"answer": "Your helpful response", "related_teaching_points": ["Any teaching points this reinforces"]}"""
 
-  def _build_feedback_prompt(self, request: FeedbackRequest, patient_context: str) -> str:
-    """Build the feedback prompt with patient context."""
-    context_line = f"- **Additional Context**: {request.context}" if request.context else ""
 
-    prompt = f"""## Patient Context
+# Templates for the feedback/question/debrief endpoints, filled with format_map
+_FEEDBACK_TEMPLATE = """## Patient Context
 {patient_context}
 
 ## The Situation
-- **Learner Level**: {request.learner_level}
-- **Action Type**: {request.action_type}
-- **What They Did**: {request.learner_action}
+- **Learner Level**: {learner_level}
+- **Action Type**: {action_type}
+- **What They Did**: {learner_action}
 {context_line}
 
 ## Your Task
@@ -149,20 +307,14 @@ Respond with valid JSON only. No markdown, no code blocks:
 
 {{"feedback": "Your response to the learner - direct, helpful, not preachy", "feedback_type": "praise|correction|question|suggestion", "clinical_issue": "If there's a safety issue, state it clearly. Otherwise null", "follow_up_question": "Optional: One question to deepen thinking. Can be null if feedback is sufficient"}}"""
 
-    return prompt
-
-  def _build_question_prompt(self, request: QuestionRequest, patient_context: str) -> str:
-    """Build the question prompt from template."""
-    topic_line = f"- **Focus Topic**: {request.topic}" if request.topic else ""
-
-    prompt = f"""A learner is asking you a question. Your job is to help them learn - not to quiz them.
+_QUESTION_TEMPLATE = """A learner is asking you a question. Your job is to help them learn - not to quiz them.
 
 ## Patient Context
 {patient_context}
 
 ## The Situation
-- **Learner Level**: {request.learner_level}
-- **Their Question**: {request.learner_question}
+- **Learner Level**: {learner_level}
+- **Their Question**: {learner_question}
 {topic_line}
 
 ## Your Task
@@ -202,34 +354,25 @@ Respond with valid JSON only. No markdown, no code blocks:
 
 {{"question": "Your helpful response - could be a question, guidance, information, or reframe", "hint": "Optional gentle nudge or additional context. Can be null", "topic": "The clinical concept this addresses"}}"""
 
-    return prompt
-
-  def _build_debrief_prompt(self, request: DebriefRequest, patient_context: str) -> str:
-    """Build the debrief prompt from template."""
-    enc = request.encounter
-
-    known_errors_line = f"### Known Errors in Scenario\n{', '.join(enc.known_errors)}" if enc.known_errors else ""
-    focus_areas_line = f"- **Focus Areas**: {', '.join(request.focus_areas)}" if request.focus_areas else ""
-
-    prompt = f"""The encounter is over. Your job is to help the learner reflect and grow.
+_DEBRIEF_TEMPLATE = """The encounter is over. Your job is to help the learner reflect and grow.
 
 ## Patient Context
 {patient_context}
 
 ## The Encounter
-- **Type**: {enc.encounter_type}
-- **Chief Complaint**: {enc.chief_complaint}
+- **Type**: {encounter_type}
+- **Chief Complaint**: {chief_complaint}
 
 ### What They Did
-- **History Gathered**: {', '.join(enc.history_gathered) if enc.history_gathered else 'none documented'}
-- **Exam Findings**: {', '.join(enc.exam_findings) if enc.exam_findings else 'none documented'}
-- **Differential**: {', '.join(enc.differential) if enc.differential else 'none documented'}
-- **Orders/Plan**: {', '.join(enc.orders_placed) if enc.orders_placed else 'none'}
+- **History Gathered**: {history}
+- **Exam Findings**: {exam}
+- **Differential**: {differential}
+- **Orders/Plan**: {orders}
 
 {known_errors_line}
 
 ## Learner Info
-- **Level**: {request.learner_level}
+- **Level**: {learner_level}
 {focus_areas_line}
 
 ## Debrief Principles
@@ -267,77 +410,388 @@ Respond with valid JSON only. No markdown, no code blocks:
 
 {{"summary": "2-3 sentences capturing how the encounter went overall. End with a brief check-in.", "strengths": ["Specific things done well - reference actual actions"], "areas_for_improvement": ["Specific areas to work on - explain why it matters"], "missed_items": ["Things that should have been caught - if any, otherwise empty array"], "teaching_points": ["1-3 clinical pearls from this case"], "follow_up_resources": ["Optional: relevant guidelines, articles, or resources. Can be empty array"]}}"""
 
-    return prompt
 
-  async def provide_feedback(self, request: FeedbackRequest) -> FeedbackResponse:
-    """Provide feedback on a learner action."""
-    patient_context = format_patient_context(request.patient)
-    prompt = self._build_feedback_prompt(request, patient_context)
+# Citation searches started while a debrief is generating, keyed by case
+# session_id. Post-debrief Q&A reuses the result instead of searching again.
+_citation_prefetch: dict[str, asyncio.Task] = {}
+MAX_CITATION_PREFETCH = 256
+
+
+def _prefetch_citations(session_id: str, topic: str) -> None:
+  """Start a background citation search for a case's condition."""
+  if session_id in _citation_prefetch:
+    return
+  if len(_citation_prefetch) >= MAX_CITATION_PREFETCH:
+    _citation_prefetch.pop(next(iter(_citation_prefetch))).cancel()
+  task = asyncio.create_task(get_citation_search().search(topic, num_results=3))
+  # Q&A may never follow, so mark a failed search's error as retrieved
+  task.add_done_callback(_consume_task_exception)
+  _citation_prefetch[session_id] = task
+
+
+def _consume_task_exception(task: asyncio.Task) -> None:
+  """Retrieve a finished task's exception so asyncio doesn't log it as unhandled."""
+  if not task.cancelled():
+    task.exception()
 
-    response = self.client.messages.create(
-      model=self.model,
-      max_tokens=1024,
-      system=self.system_prompt,
-      messages=[{"role": "user", "content": prompt}]
-    )
 
-    content = clean_json_response(response.content[0].text)
+async def _get_case_citations(session_id: Optional[str], topic: Optional[str]) -> Optional[list[dict]]:
+  """Get citations for a completed case, preferring a prefetched search.
+
+  Falls back to a fresh search when nothing was prefetched (e.g. cases
+  debriefed by another worker or before a restart) or the prefetch
+  failed. The fresh search is stored like a prefetch, so later questions
+  on the case reuse it.
+  """
+  result = None
+  task = _citation_prefetch.get(session_id) if session_id else None
+  if task is not None:
     try:
-      data = json.loads(content)
-      return FeedbackResponse(**data)
-    except json.JSONDecodeError:
-      return FeedbackResponse(
-        feedback=response.content[0].text,
-        feedback_type="suggestion",
-      )
+      result = await task
+    except Exception:
+      result = None
+
+  if result is None:
+    if not topic:
+      return None
+    if session_id:
+      _citation_prefetch.pop(session_id, None)
+      _prefetch_citations(session_id, topic)
+      result = await _citation_prefetch[session_id]
+    else:
+      result = await get_citation_search().search(topic, num_results=3)
+
+  return [c.model_dump() for c in result.citations] or None
+
+
+def _iter_citation_lines(citation) -> Iterator[str]:
+  """Yield the prompt lines for one citation."""
+  yield f"- **{citation.source}**: {citation.title}"
+  if citation.snippet:
+    yield f"  {citation.snippet[:150]}..."
+
+
+def _iter_case_parts(case: DescribedCase) -> Iterator[str]:
+  """Yield the known fields of a described case as prompt lines."""
+  if case.age_description:
+    yield f"**Patient**: {case.age_description}"
+  if case.chief_complaint:
+    yield f"**Chief Complaint**: {case.chief_complaint}"
+  if case.key_history:
+    yield f"**History**: {', '.join(case.key_history)}"
+  if case.key_findings:
+    yield f"**Findings**: {', '.join(case.key_findings)}"
+  if case.learner_assessment:
+    yield f"**Learner's Assessment**: {case.learner_assessment}"
+  if case.learner_plan:
+    yield f"**Plan**: {case.learner_plan}"
+  if case.actual_outcome:
+    yield f"**Outcome**: {case.actual_outcome}"
+
+
+# Phrases that signal the learner wants evidence behind the discussion
+_EVIDENCE_TRIGGER_RE = re.compile("|".join(map(re.escape, [
+  "evidence", "guideline", "protocol", "recommendation",
+  "best practice", "standard of care", "what does the literature",
+  "aap says", "cdc", "should i have",
+])))
+
+# Fallback citation topics by keyword, checked in priority order
+_CITATION_TOPIC_KEYWORDS = (
+  ("fever", "pediatric fever management"),
+  ("ear", "acute otitis media treatment"),
+  ("cough", "pediatric cough evaluation"),
+)
 
-  async def ask_socratic_question(self, request: QuestionRequest) -> QuestionResponse:
-    """Generate a helpful response to learner question."""
-    normalized_patient = request.get_normalized_patient()
-    patient_context = format_patient_context(normalized_patient) if normalized_patient else "No patient context provided."
-    prompt = self._build_question_prompt(request, patient_context)
 
-    response = self.client.messages.create(
-      model=self.model,
-      max_tokens=512,
-      system=self.system_prompt,
-      messages=[{"role": "user", "content": prompt}]
+# Per-phase tutor guidance for case-based teaching
+_PHASE_GUIDANCE: dict[CasePhase, str] = {
+  # Sick visit phases
+  CasePhase.INTRO: "The learner is just starting. Let them take the lead.",
+  CasePhase.HISTORY: "They're gathering history. Answer their questions as the parent would. Don't volunteer information they haven't asked about.",
+  CasePhase.EXAM: "They want to examine. Describe what they find based on the exam findings. Be specific about normal and abnormal findings.",
+  CasePhase.ASSESSMENT: "They're forming an assessment. Listen to their thinking. Gently probe if their differential is incomplete.",
+  CasePhase.PLAN: "They're making a plan. Validate good choices, gently question problematic ones. Remember: shared decision-making with the parent matters.",
+  CasePhase.DEBRIEF: "Time to debrief. Summarize what they did well and areas to improve.",
+  CasePhase.COMPLETE: "The case is complete.",
+  # Well-child phases
+  CasePhase.GROWTH_REVIEW: "They're reviewing growth. See if they interpret trajectory, not just read numbers.",
+  CasePhase.DEVELOPMENTAL_SCREENING: "They're assessing development. See if they cover all domains and know screening tools.",
+  CasePhase.ANTICIPATORY_GUIDANCE: "They're counseling the parent. Don't prompt topics — see what they cover. Play the parent with realistic questions.",
+  CasePhase.IMMUNIZATIONS: "They're addressing vaccines. See if they know what's due. If parent is hesitant, stay in character.",
+  CasePhase.PARENT_QUESTIONS: "The parent has a question or concern. This may include an incidental finding. See how the learner handles it.",
+}
+_DEFAULT_PHASE_GUIDANCE = "Continue the encounter naturally."
+
+# Per-phase task prompts for describe-a-case mode
+_DESCRIBE_PHASE_PROMPTS: dict[DescribeCasePhase, str] = {
+  DescribeCasePhase.LISTENING: """## Your Task
+You're gathering the case. Ask follow-up questions to understand:
+- The chief complaint and history
+- Key exam findings
+- What they were thinking (differential)
+- What they did or planned to do
+
+Be curious and engaged. "And then what happened?" "What were you thinking at that point?"
+""",
+  DescribeCasePhase.DISCUSSING: """## Your Task
+You have enough of the case to discuss it. Focus on:
+- What they did well (be specific)
+- Any teaching opportunities (share insights, not criticisms)
+- Alternative approaches they might consider
+- Clinical pearls relevant to this case
+
+Stay conversational. You're colleagues discussing an interesting case, not a formal evaluation.""",
+  DescribeCasePhase.TEACHING: """## Your Task
+Time for focused teaching. Share:
+- Key clinical pearls for this type of case
+- Evidence-based guidelines if relevant
+- Things to watch for next time
+
+Keep it practical and memorable. They should leave with 2-3 things they'll actually use.""",
+}
+
+
+def format_patient_context(patient: PatientContext) -> str:
+  """Format patient context for the prompt (rendered once per patient)."""
+  if patient._prompt_context is None:
+    patient._prompt_context = _render_patient_context(patient)
+  return patient._prompt_context
+
+
+def _render_patient_context(patient: PatientContext) -> str:
+  """Render patient context as prompt text."""
+  lines = [
+    f"PATIENT: {patient.name}, {patient.age_display}, {patient.sex or 'sex unknown'}",
+    f"Source: {patient.source}",
+  ]
+
+  # any() probes for a first active item before building the joined section,
+  # so long imported lists with nothing active cost no allocation
+  if any(c.is_active for c in patient.problem_list):
+    lines.append("Active Problems: " + ", ".join(
+      c.display_name for c in patient.problem_list if c.is_active))
+
+  if any(m.is_active for m in patient.medication_list):
+    lines.append("Medications: " + ", ".join(
+      m.display_name for m in patient.medication_list if m.is_active))
+
+  if patient.allergy_list:
+    lines.append("ALLERGIES: " + ", ".join(
+      f"{a.display_name} ({a.reaction})" if a.reaction else a.display_name
+      for a in patient.allergy_list))
+
+  if patient.recent_encounters:
+    enc = patient.recent_encounters[0]
+    lines.append(f"Last visit: {enc.date} - {enc.chief_complaint}")
+
+  return "\n".join(lines)
+
+
+class Tutor:
+  """Claude-powered medical tutor."""
+
+  def __init__(self, api_key: str = None, model: str = None):
+    settings = get_settings()
+    self.client = anthropic.AsyncAnthropic(
+      api_key=api_key or settings.anthropic_api_key,
+      http_client=get_anthropic_http_client(),
     )
+    # Bound once; every endpoint call goes through it
+    self._create = self.client.messages.create
+    self.model = model or settings.claude_model
+    self.system_prompt = get_system_prompt()
 
-    content = clean_json_response(response.content[0].text)
-    try:
-      data = json.loads(content)
-      return QuestionResponse(**data)
-    except json.JSONDecodeError:
-      return QuestionResponse(
-        question=response.content[0].text,
-        topic="clinical reasoning",
-      )
+  def _build_feedback_prompt(self, request: FeedbackRequest, patient_context: str) -> str:
+    """Build the feedback prompt with patient context."""
+    return _FEEDBACK_TEMPLATE.format_map({
+      "patient_context": patient_context,
+      "learner_level": request.learner_level,
+      "action_type": request.action_type,
+      "learner_action": request.learner_action,
+      "context_line": f"- **Additional Context**: {request.context}" if request.context else "",
+    })
 
-  async def debrief_encounter(self, request: DebriefRequest) -> DebriefResponse:
-    """Provide post-encounter debrief."""
+  def _build_question_prompt(self, request: QuestionRequest, patient_context: str) -> str:
+    """Build the question prompt from template."""
+    return _QUESTION_TEMPLATE.format_map({
+      "patient_context": patient_context,
+      "learner_level": request.learner_level,
+      "learner_question": request.learner_question,
+      "topic_line": f"- **Focus Topic**: {request.topic}" if request.topic else "",
+    })
+
+  def _build_debrief_prompt(self, request: DebriefRequest, patient_context: str) -> str:
+    """Build the debrief prompt from template."""
+    enc = request.encounter
+    return _DEBRIEF_TEMPLATE.format_map({
+      "patient_context": patient_context,
+      "encounter_type": enc.encounter_type,
+      "chief_complaint": enc.chief_complaint,
+      "history": ', '.join(enc.history_gathered) or 'none documented',
+      "exam": ', '.join(enc.exam_findings) or 'none documented',
+      "differential": ', '.join(enc.differential) or 'none documented',
+      "orders": ', '.join(enc.orders_placed) or 'none',
+      "known_errors_line": f"### Known Errors in Scenario\n{', '.join(enc.known_errors)}" if enc.known_errors else "",
+      "learner_level": request.learner_level,
+      "focus_areas_line": f"- **Focus Areas**: {', '.join(request.focus_areas)}" if request.focus_areas else "",
+    })
+
+  def _feedback_params(self, request: FeedbackRequest) -> dict:
+    """Build messages.create params for a feedback request."""
+    patient_context = format_patient_context(request.patient)
+    prompt = self._build_feedback_prompt(request, patient_context)
+    return {
+      "model": self.model,
+      "max_tokens": 1024,
+      "system": self.system_prompt,
+      "messages": [{"role": "user", "content": prompt}],
+    }
+
+  def _question_params(self, request: QuestionRequest) -> dict:
+    """Build messages.create params for a Socratic question request."""
+    normalized_patient = request.get_normalized_patient()
+    patient_context = format_patient_context(normalized_patient) if normalized_patient else "No patient context provided."
+    prompt = self._build_question_prompt(request, patient_context)
+    return {
+      "model": self.model,
+      "max_tokens": 512,
+      "system": self.system_prompt,
+      "messages": [{"role": "user", "content": prompt}],
+    }
+
+  def _debrief_params(self, request: DebriefRequest) -> dict:
+    """Build messages.create params for an encounter debrief request."""
     patient_context = format_patient_context(request.patient)
     prompt = self._build_debrief_prompt(request, patient_context)
+    return {
+      "model": self.model,
+      "max_tokens": 2048,
+      "system": self.system_prompt,
+      "messages": [{"role": "user", "content": prompt}],
+    }
 
-    response = self.client.messages.create(
-      model=self.model,
-      max_tokens=2048,
-      system=self.system_prompt,
-      messages=[{"role": "user", "content": prompt}]
+  def _parse_feedback(self, text: str) -> FeedbackResponse:
+    """Parse Claude's feedback JSON, falling back to plain text."""
+    return _parse_response(
+      text, _FEEDBACK_ADAPTER,
+      lambda t: FeedbackResponse(feedback=t, feedback_type="suggestion"),
     )
 
-    content = clean_json_response(response.content[0].text)
-    try:
-      data = json.loads(content)
-      return DebriefResponse(**data)
-    except json.JSONDecodeError:
-      return DebriefResponse(
-        summary=response.content[0].text,
+  def _parse_question(self, text: str) -> QuestionResponse:
+    """Parse Claude's question JSON, falling back to plain text."""
+    return _parse_response(
+      text, _QUESTION_ADAPTER,
+      lambda t: QuestionResponse(question=t, topic="clinical reasoning"),
+    )
+
+  def _parse_debrief(self, text: str) -> DebriefResponse:
+    """Parse Claude's debrief JSON, falling back to plain text."""
+    return _parse_response(
+      text, _DEBRIEF_ADAPTER,
+      lambda t: DebriefResponse(
+        summary=t,
         strengths=[],
         areas_for_improvement=[],
         missed_items=[],
         teaching_points=[],
-      )
+      ),
+    )
+
+  async def provide_feedback(self, request: FeedbackRequest) -> FeedbackResponse:
+    """Provide feedback on a learner action."""
+    response = await self._create(**self._feedback_params(request))
+    return self._parse_feedback(response.content[0].text)
+
+  async def ask_socratic_question(self, request: QuestionRequest) -> QuestionResponse:
+    """Generate a helpful response to learner question."""
+    response = await self._create(**self._question_params(request))
+    return self._parse_question(response.content[0].text)
+
+  async def debrief_encounter(self, request: DebriefRequest) -> DebriefResponse:
+    """Provide post-encounter debrief."""
+    response = await self._create(**self._debrief_params(request))
+    return self._parse_debrief(response.content[0].text)
+
+  async def stream_feedback(
+    self, request: FeedbackRequest
+  ) -> AsyncIterator[Union[str, FeedbackResponse]]:
+    """Stream feedback text as it generates, then yield the parsed response.
+
+    Yields raw text deltas for early display; the final item is the
+    FeedbackResponse, parsed once from the complete message.
+    """
+    async with self.client.messages.stream(**self._feedback_params(request)) as stream:
+      async for text in stream.text_stream:
+        yield text
+      message = await stream.get_final_message()
+    yield self._parse_feedback(message.content[0].text)
+
+  async def process_turn(
+    self,
+    feedback_request: FeedbackRequest,
+    question_request: Optional[QuestionRequest] = None,
+  ) -> tuple[FeedbackResponse, Optional[QuestionResponse]]:
+    """Run feedback and an optional Socratic question for one turn concurrently."""
+    if question_request is None:
+      return await self.provide_feedback(feedback_request), None
+    feedback, question = await asyncio.gather(
+      self.provide_feedback(feedback_request),
+      self.ask_socratic_question(question_request),
+    )
+    return feedback, question
+
+  async def grade_cohort(self, requests: list[FeedbackRequest]) -> list[FeedbackResponse]:
+    """Provide feedback on many learners' actions, a bounded number at a time."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def bounded(request: FeedbackRequest) -> FeedbackResponse:
+      async with semaphore:
+        return await self.provide_feedback(request)
+
+    return list(await asyncio.gather(*map(bounded, requests)))
+
+  # ==================== BATCH (NON-INTERACTIVE) METHODS ====================
+  # The Message Batches API costs half as much per token but can take minutes
+  # to hours to finish. Use these for bulk grading and replayed debriefs only;
+  # interactive requests should keep using the methods above.
+
+  async def _run_batch(self, params: list[dict]) -> list[Optional[str]]:
+    """Submit requests as one Message Batch and wait for the results.
+
+    Returns the response text for each request in input order, or None for
+    requests that errored, expired, or were canceled.
+    """
+    if not params:
+      return []
+
+    batch = await self.client.messages.batches.create(requests=[
+      {"custom_id": str(i), "params": p} for i, p in enumerate(params)
+    ])
+    while batch.processing_status != "ended":
+      await asyncio.sleep(BATCH_POLL_INTERVAL_SECONDS)
+      batch = await self.client.messages.batches.retrieve(batch.id)
+
+    texts: list[Optional[str]] = [None] * len(params)
+    async for entry in await self.client.messages.batches.results(batch.id):
+      if entry.result.type == "succeeded":
+        texts[int(entry.custom_id)] = entry.result.message.content[0].text
+    return texts
+
+  async def batch_feedback(self, requests: list[FeedbackRequest]) -> list[Optional[FeedbackResponse]]:
+    """Provide feedback on many learner actions via the Message Batches API."""
+    texts = await self._run_batch([self._feedback_params(r) for r in requests])
+    return [self._parse_feedback(t) if t is not None else None for t in texts]
+
+  async def batch_questions(self, requests: list[QuestionRequest]) -> list[Optional[QuestionResponse]]:
+    """Answer many learner questions via the Message Batches API."""
+    texts = await self._run_batch([self._question_params(r) for r in requests])
+    return [self._parse_question(t) if t is not None else None for t in texts]
+
+  async def batch_debriefs(self, requests: list[DebriefRequest]) -> list[Optional[DebriefResponse]]:
+    """Debrief many encounters via the Message Batches API."""
+    texts = await self._run_batch([self._debrief_params(r) for r in requests])
+    return [self._parse_debrief(t) if t is not None else None for t in texts]
 
   # ==================== CASE-BASED TEACHING METHODS ====================
 
@@ -358,9 +812,8 @@ Respond with valid JSON only. No markdown, no code blocks:
     lines.append("You can reference what an image shows (e.g., 'As you can see in the image...')")
     return "\n".join(lines)
 
-  def _build_case_system_prompt(self, case_state: "CaseState", condition_info: dict) -> str:
+  def _build_case_system_prompt(self, case_state: CaseState, condition_info: dict) -> str:
     """Build a system prompt for case-based teaching with fluid voice."""
-    from ..cases.models import VisitType
     if case_state.visit_type == VisitType.WELL_CHILD:
       return self._build_well_child_system_prompt(case_state, condition_info)
 
@@ -455,7 +908,7 @@ When stepping BACK into parent roleplay:
 
 Keep transitions BRIEF - one short bracketed phrase, then your content. Don't over-explain the switch."""
 
-  def _build_well_child_system_prompt(self, case_state: "CaseState", framework: dict) -> str:
+  def _build_well_child_system_prompt(self, case_state: CaseState, framework: dict) -> str:
     """Build system prompt for well-child case teaching."""
     patient = case_state.patient
     well_child_prompt = get_well_child_prompt()
@@ -550,9 +1003,8 @@ Keep transitions BRIEF - one short bracketed phrase, then your content. Don't ov
 5. **Incidental finding** - If present, reveal naturally during appropriate phase
 6. **Celebrate thoroughness** - Praise when they remember important screenings or guidance topics"""
 
-  async def generate_case_opening(self, case_state: "CaseState", condition_info: dict) -> str:
+  async def generate_case_opening(self, case_state: CaseState, condition_info: dict) -> str:
     """Generate the opening message for a case."""
-    from ..cases.models import VisitType
     patient = case_state.patient
 
     if case_state.visit_type == VisitType.WELL_CHILD:
@@ -589,7 +1041,7 @@ This is their first interaction - make it feel welcoming and zero-pressure."""
 
     system = self._build_case_system_prompt(case_state, condition_info)
 
-    response = self.client.messages.create(
+    response = await self._create(
       model=self.model,
       max_tokens=512,
       system=system,
@@ -598,7 +1050,7 @@ This is their first interaction - make it feel welcoming and zero-pressure."""
 
     return response.content[0].text
 
-  def _detect_stuck(self, message: str, case_state: "CaseState") -> bool:
+  def _detect_stuck(self, message: str, case_state: CaseState) -> bool:
     """Detect if the learner seems stuck based on their message patterns.
 
     Signs of being stuck:
@@ -652,9 +1104,9 @@ This is their first interaction - make it feel welcoming and zero-pressure."""
   async def process_case_message(
     self,
     message: str,
-    case_state: "CaseState",
+    case_state: CaseState,
     condition_info: dict,
-  ) -> tuple[str, "CaseState", Optional[str], bool]:
+  ) -> tuple[str, CaseState, Optional[str], bool]:
     """Process a learner message during a case.
 
     Returns (response, updated_case_state, optional_teaching_moment, hint_offered)
@@ -712,7 +1164,7 @@ Remember: help, don't interrogate."""
 
     system = self._build_case_system_prompt(updated_state, condition_info)
 
-    response = self.client.messages.create(
+    response = await self._create(
       model=self.model,
       max_tokens=1024,
       system=system,
@@ -733,9 +1185,8 @@ Remember: help, don't interrogate."""
 
     return response_text, updated_state, teaching_moment, is_stuck
 
-  def _update_case_phase(self, message: str, case_state: "CaseState") -> "CaseState":
+  def _update_case_phase(self, message: str, case_state: CaseState) -> CaseState:
     """Update case phase based on learner's message."""
-    from ..cases.models import CasePhase, VisitType
 
     if case_state.visit_type == VisitType.WELL_CHILD:
       return self._update_well_child_phase(message, case_state)
@@ -765,9 +1216,8 @@ Remember: help, don't interrogate."""
 
     return case_state
 
-  def _update_well_child_phase(self, message: str, case_state: "CaseState") -> "CaseState":
+  def _update_well_child_phase(self, message: str, case_state: CaseState) -> CaseState:
     """Update well-child case phase based on learner's message."""
-    from ..cases.models import CasePhase
     msg_lower = message.lower()
 
     if case_state.phase == CasePhase.INTRO:
@@ -799,34 +1249,18 @@ Remember: help, don't interrogate."""
 
     return case_state
 
-  def _get_phase_guidance(self, phase: "CasePhase") -> str:
+  def _get_phase_guidance(self, phase: CasePhase) -> str:
     """Get phase-specific guidance for the tutor."""
-    from ..cases.models import CasePhase
-
-    guidance = {
-      # Sick visit phases
-      CasePhase.INTRO: "The learner is just starting. Let them take the lead.",
-      CasePhase.HISTORY: "They're gathering history. Answer their questions as the parent would. Don't volunteer information they haven't asked about.",
-      CasePhase.EXAM: "They want to examine. Describe what they find based on the exam findings. Be specific about normal and abnormal findings.",
-      CasePhase.ASSESSMENT: "They're forming an assessment. Listen to their thinking. Gently probe if their differential is incomplete.",
-      CasePhase.PLAN: "They're making a plan. Validate good choices, gently question problematic ones. Remember: shared decision-making with the parent matters.",
-      CasePhase.DEBRIEF: "Time to debrief. Summarize what they did well and areas to improve.",
-      CasePhase.COMPLETE: "The case is complete.",
-      # Well-child phases
-      CasePhase.GROWTH_REVIEW: "They're reviewing growth. See if they interpret trajectory, not just read numbers.",
-      CasePhase.DEVELOPMENTAL_SCREENING: "They're assessing development. See if they cover all domains and know screening tools.",
-      CasePhase.ANTICIPATORY_GUIDANCE: "They're counseling the parent. Don't prompt topics — see what they cover. Play the parent with realistic questions.",
-      CasePhase.IMMUNIZATIONS: "They're addressing vaccines. See if they know what's due. If parent is hesitant, stay in character.",
-      CasePhase.PARENT_QUESTIONS: "The parent has a question or concern. This may include an incidental finding. See how the learner handles it.",
-    }
-    return guidance.get(phase, "Continue the encounter naturally.")
+    return _PHASE_GUIDANCE.get(phase, _DEFAULT_PHASE_GUIDANCE)
 
-  async def generate_well_child_debrief(self, case_state: "CaseState", framework: dict) -> dict:
+  async def generate_well_child_debrief(self, case_state: CaseState, framework: dict) -> dict:
     """Generate well-child debrief with domain scores."""
     patient = case_state.patient
     well_child_debrief_prompt = get_well_child_debrief_prompt()
 
-    prompt = f"""{well_child_debrief_prompt}
+    prompt = "".join([
+      well_child_debrief_prompt,
+      f"""
 
 ## Case Summary
 - **Visit**: {framework.get('topic', 'Well-Child Visit')}
@@ -847,20 +1281,19 @@ Remember: help, don't interrogate."""
 - **Screening tools**: {json.dumps(framework.get('screening_tools', []))}
 - **Anticipatory guidance**: {json.dumps(framework.get('anticipatory_guidance', {}))}
 
-## Response Format
-Return valid JSON only:
-{{"summary": "2-3 sentences", "strengths": ["specific strengths"], "areas_for_improvement": ["specific areas"], "missed_items": ["what was missed"], "teaching_points": ["1-3 pearls"], "follow_up_resources": ["optional resources"], "well_child_scores": {{"growth_interpretation": {{"score": 0, "feedback": "specific feedback"}}, "milestone_assessment": {{"score": 0, "feedback": "..."}}, "exam_thoroughness": {{"score": 0, "feedback": "..."}}, "anticipatory_guidance": {{"score": 0, "feedback": "..."}}, "immunization_knowledge": {{"score": 0, "feedback": "..."}}, "communication_skill": {{"score": 0, "feedback": "..."}}}}}}"""
+""",
+      _WELL_CHILD_JSON_SKELETON,
+    ])
 
-    response = self.client.messages.create(
+    response = await self._create(
       model=self.model,
       max_tokens=1500,
       system=self.system_prompt,
       messages=[{"role": "user", "content": prompt}]
     )
 
-    content = clean_json_response(response.content[0].text)
     try:
-      return json.loads(content)
+      return parse_json_response(response.content[0].text)
     except json.JSONDecodeError:
       return {
         "summary": "Case complete.",
@@ -872,19 +1305,24 @@ Return valid JSON only:
         "well_child_scores": None,
       }
 
-  async def generate_debrief(self, case_state: "CaseState", condition_info: dict) -> dict:
+  async def generate_debrief(self, case_state: CaseState, condition_info: dict) -> dict:
     """Generate end-of-case debrief with structured data.
 
     Returns a dict with: summary, strengths, areas_for_improvement,
     missed_items, teaching_points, follow_up_resources
+
+    Also starts a background citation search for the condition so the
+    first post-debrief question doesn't wait on it.
     """
-    from ..cases.models import VisitType
+    _prefetch_citations(case_state.session_id, case_state.patient.condition_display)
+
     if case_state.visit_type == VisitType.WELL_CHILD:
       return await self.generate_well_child_debrief(case_state, condition_info)
 
     patient = case_state.patient
 
-    debrief_prompt = f"""The case is complete. Time for a debrief.
+    debrief_prompt = "".join([
+      f"""The case is complete. Time for a debrief.
 
 ## Case Summary
 - **Patient**: {patient.name}, {patient.age} {patient.age_unit} old
@@ -898,37 +1336,24 @@ Return valid JSON only:
 - **Plan proposed**: {', '.join(case_state.plan_proposed) if case_state.plan_proposed else 'Not clearly stated'}
 
 ## Teaching Goals for This Condition
-{chr(10).join(['- ' + goal for goal in condition_info.get('teaching_goals', [])])}
-
-## Clinical Pearls
-{chr(10).join(['- ' + pearl for pearl in condition_info.get('clinical_pearls', [])])}
-
-## Instructions
-
-Provide a warm, encouraging debrief that helps them learn and grow.
-
-Be specific:
-- Reference actual things they said/did
-- Explain WHY things matter, not just THAT they're important
-- Share 1-2 clinical pearls they can use next time
-- End the summary with a brief check-in
-
-## Response Format
-
-Return valid JSON only. No markdown, no code blocks:
-
-{{"summary": "2-3 sentences capturing how the encounter went overall. End with a brief check-in: 'How did that feel?' or 'Anything you want to talk through?'", "strengths": ["Specific things done well - reference actual actions from the conversation"], "areas_for_improvement": ["Specific areas to work on - explain why it matters for patient care"], "missed_items": ["Things that should have been caught - if any, otherwise empty array"], "teaching_points": ["1-3 clinical pearls from this case that they can apply next time"], "follow_up_resources": ["Optional: relevant guidelines or resources - can be empty array"]}}"""
-
-    response = self.client.messages.create(
+""",
+      _bullets(condition_info.get('teaching_goals', [])),
+      "\n\n## Clinical Pearls\n",
+      _bullets(condition_info.get('clinical_pearls', [])),
+      "\n\n",
+      _DEBRIEF_INSTRUCTIONS,
+      _DEBRIEF_JSON_SKELETON,
+    ])
+
+    response = await self._create(
       model=self.model,
       max_tokens=1024,
       system=self.system_prompt,
       messages=[{"role": "user", "content": debrief_prompt}]
     )
 
-    content = clean_json_response(response.content[0].text)
     try:
-      data = json.loads(content)
+      data = parse_json_response(response.content[0].text)
       return data
     except json.JSONDecodeError:
       # Fallback to unstructured response
@@ -956,7 +1381,7 @@ Start with a warm invitation to tell you about the case. Something like:
 
 Keep it brief and welcoming. They should feel like you're genuinely interested, not testing them."""
 
-    response = self.client.messages.create(
+    response = await self._create(
       model=self.model,
       max_tokens=256,
       system=self.system_prompt,
@@ -968,14 +1393,12 @@ Keep it brief and welcoming. They should feel like you're genuinely interested,
   async def process_describe_message(
     self,
     message: str,
-    state: "DescribeCaseState",
-  ) -> tuple[str, "DescribeCaseState", Optional[list[dict]]]:
+    state: DescribeCaseState,
+  ) -> tuple[str, DescribeCaseState, Optional[list[dict]]]:
     """Process a message in describe-a-case mode.
 
     Returns: (response, updated_state, citations_if_any)
     """
-    from ..cases.models import DescribeCasePhase
-    from .citations import get_citation_search
 
     # Build conversation history
     messages = []
@@ -991,16 +1414,13 @@ Keep it brief and welcoming. They should feel like you're genuinely interested,
     # Check if we should search for citations
     citations = None
     citation_context = ""
-    if self._should_search_citations(message, state):
-      search = get_citation_search()
-      # Extract topic from the case
-      topic = self._extract_citation_topic(message, state)
-      if topic:
-        result = await search.search(topic, num_results=3)
-        if result.citations:
-          citations = [c.model_dump() for c in result.citations]
-          state.citations.extend(citations)
-          citation_context = self._format_citations_for_prompt(result.citations)
+    should_search, topic = self._plan_citations(message, state)
+    if should_search and topic:
+      result = await get_citation_search().search(topic, num_results=3)
+      if result.citations:
+        citations = [c.model_dump() for c in result.citations]
+        state.citations.extend(citations)
+        citation_context = self._format_citations_for_prompt(result.citations)
 
     # Build the prompt
     case_summary = self._summarize_described_case(state.case)
@@ -1026,7 +1446,7 @@ Learner: "{message}"
 
     messages[-1] = {"role": "user", "content": prompt}
 
-    response = self.client.messages.create(
+    response = await self._create(
       model=self.model,
       max_tokens=1024,
       system=self.system_prompt,
@@ -1040,45 +1460,12 @@ Learner: "{message}"
 
     return response_text, updated_state, citations
 
-  def _get_describe_phase_prompt(self, message: str, state: "DescribeCaseState") -> str:
+  def _get_describe_phase_prompt(self, message: str, state: DescribeCaseState) -> str:
     """Get phase-specific guidance for describe mode."""
-    from ..cases.models import DescribeCasePhase
-
-    if state.phase == DescribeCasePhase.LISTENING:
-      return """## Your Task
-You're gathering the case. Ask follow-up questions to understand:
-- The chief complaint and history
-- Key exam findings
-- What they were thinking (differential)
-- What they did or planned to do
-
-Be curious and engaged. "And then what happened?" "What were you thinking at that point?"
-"""
-
-    elif state.phase == DescribeCasePhase.DISCUSSING:
-      return """## Your Task
-You have enough of the case to discuss it. Focus on:
-- What they did well (be specific)
-- Any teaching opportunities (share insights, not criticisms)
-- Alternative approaches they might consider
-- Clinical pearls relevant to this case
-
-Stay conversational. You're colleagues discussing an interesting case, not a formal evaluation."""
+    return _DESCRIBE_PHASE_PROMPTS.get(state.phase, "Continue the discussion naturally.")
 
-    elif state.phase == DescribeCasePhase.TEACHING:
-      return """## Your Task
-Time for focused teaching. Share:
-- Key clinical pearls for this type of case
-- Evidence-based guidelines if relevant
-- Things to watch for next time
-
-Keep it practical and memorable. They should leave with 2-3 things they'll actually use."""
-
-    return "Continue the discussion naturally."
-
-  def _update_describe_phase(self, message: str, state: "DescribeCaseState") -> "DescribeCaseState":
+  def _update_describe_phase(self, message: str, state: DescribeCaseState) -> DescribeCaseState:
     """Update phase based on conversation progress."""
-    from ..cases.models import DescribeCasePhase
 
     msg_lower = message.lower()
 
@@ -1101,75 +1488,41 @@ Keep it practical and memorable. They should leave with 2-3 things they'll actua
 
     return state
 
-  def _should_search_citations(self, message: str, state: "DescribeCaseState") -> bool:
-    """Determine if we should search for citations."""
-    msg_lower = message.lower()
-
-    # Search if they ask about evidence, guidelines, or best practice
-    evidence_triggers = [
-      "evidence", "guideline", "protocol", "recommendation",
-      "best practice", "standard of care", "what does the literature",
-      "aap says", "cdc", "should i have"
-    ]
+  def _plan_citations(self, message: str, state: DescribeCaseState) -> tuple[bool, Optional[str]]:
+    """Decide whether to search for citations and, if so, on what topic.
 
-    return any(trigger in msg_lower for trigger in evidence_triggers)
+    Returns (should_search, topic). Searches when the learner asks about
+    evidence, guidelines, or best practice; the topic is the chief complaint
+    if known, otherwise inferred from the last few turns.
+    """
+    if not _EVIDENCE_TRIGGER_RE.search(message.lower()):
+      return False, None
 
-  def _extract_citation_topic(self, message: str, state: "DescribeCaseState") -> Optional[str]:
-    """Extract a topic to search for citations."""
     case = state.case
-
-    # Use chief complaint if available
     if case.chief_complaint:
-      return case.chief_complaint
+      return True, case.chief_complaint
 
-    # Otherwise try to extract from recent conversation
     if state.conversation:
-      last_few = state.conversation[-3:]
-      combined = " ".join([t.get("content", "") for t in last_few])
-      # Simple extraction - could be more sophisticated
-      if "fever" in combined.lower():
-        return "pediatric fever management"
-      if "ear" in combined.lower():
-        return "acute otitis media treatment"
-      if "cough" in combined.lower():
-        return "pediatric cough evaluation"
+      combined = " ".join([t.get("content", "") for t in state.conversation[-3:]]).lower()
+      for keyword, topic in _CITATION_TOPIC_KEYWORDS:
+        if keyword in combined:
+          return True, topic
 
-    return None
+    return True, None
 
   def _format_citations_for_prompt(self, citations: list) -> str:
     """Format citations for inclusion in prompt."""
     if not citations:
       return ""
 
-    lines = ["## Relevant Evidence (you can reference these)"]
-    for c in citations[:3]:
-      lines.append(f"- **{c.source}**: {c.title}")
-      if c.snippet:
-        lines.append(f"  {c.snippet[:150]}...")
+    return "\n".join(chain(
+      ("## Relevant Evidence (you can reference these)",),
+      *(_iter_citation_lines(c) for c in citations[:3]),
+    ))
 
-    return "\n".join(lines)
-
-  def _summarize_described_case(self, case: "DescribedCase") -> str:
+  def _summarize_described_case(self, case: DescribedCase) -> str:
     """Summarize what we know about the described case."""
-    from ..cases.models import DescribedCase
-
-    parts = []
-    if case.age_description:
-      parts.append(f"**Patient**: {case.age_description}")
-    if case.chief_complaint:
-      parts.append(f"**Chief Complaint**: {case.chief_complaint}")
-    if case.key_history:
-      parts.append(f"**History**: {', '.join(case.key_history)}")
-    if case.key_findings:
-      parts.append(f"**Findings**: {', '.join(case.key_findings)}")
-    if case.learner_assessment:
-      parts.append(f"**Learner's Assessment**: {case.learner_assessment}")
-    if case.learner_plan:
-      parts.append(f"**Plan**: {case.learner_plan}")
-    if case.actual_outcome:
-      parts.append(f"**Outcome**: {case.actual_outcome}")
-
-    return "\n".join(parts) if parts else ""
+    return "\n".join(_iter_case_parts(case))
 
   # ==================== POST-DEBRIEF Q&A ====================
 
@@ -1191,17 +1544,22 @@ Keep it practical and memorable. They should leave with 2-3 things they'll actua
     """
     previous_qa = previous_qa or []
 
+    # Reuse the answer to the same question, asked after the same Q&A, on this case
+    case_id = case_export.get("session_id")
+    qa_cache = get_qa_cache()
+    if case_id:
+      cached = await qa_cache.get(case_id, question, previous_qa)
+      if cached is not None:
+        return dict(cached)
+
     # Build case context
     patient = case_export.get("patient_summary", {})
     case_summary = case_export.get("case_summary", {})
     learning_materials = case_export.get("learning_materials", {})
     conversation = case_export.get("conversation_transcript", [])
 
-    # Summarize the conversation (limit to key exchanges)
-    convo_summary = []
-    for msg in conversation[-20:]:  # Last 20 messages max
-      role = "Learner" if msg.get("role") == "user" else "Echo"
-      convo_summary.append(f"{role}: {msg.get('content', '')[:200]}...")
+    # Summarize the conversation (most recent exchanges that fit the budget)
+    convo_summary = _pack_conversation(conversation)
 
     # Build previous Q&A context
     prev_qa_text = ""
@@ -1210,7 +1568,8 @@ Keep it practical and memorable. They should leave with 2-3 things they'll actua
       for qa in previous_qa[-5:]:  # Last 5 Q&A pairs
         prev_qa_text += f"Q: {qa.get('question', '')}\nA: {qa.get('answer', '')}\n\n"
 
-    prompt = f"""A learner has completed a case and is now asking a follow-up question during debrief review.
+    prompt = "".join([
+      f"""A learner has completed a case and is now asking a follow-up question during debrief review.
 
 ## Case Context
 - **Patient**: {patient.get('name', 'Unknown')}, {patient.get('age', '?')} {patient.get('age_unit', '')}
@@ -1224,55 +1583,62 @@ Keep it practical and memorable. They should leave with 2-3 things they'll actua
 - **Plan proposed**: {', '.join(case_summary.get('plan_proposed', [])) or 'Not recorded'}
 
 ## Key Conversation Moments
-{chr(10).join(convo_summary[-10:])}
-
-## Teaching Points from This Case
-{chr(10).join(['- ' + tp for tp in learning_materials.get('teaching_points', [])])}
-
-## Clinical Pearls
-{chr(10).join(['- ' + cp for cp in learning_materials.get('clinical_pearls', [])])}
+""",
+      "\n".join(convo_summary),
+      "\n\n## Teaching Points from This Case\n",
+      _bullets(learning_materials.get('teaching_points', [])),
+      "\n\n## Clinical Pearls\n",
+      _bullets(learning_materials.get('clinical_pearls', [])),
+      f"""
 
 {prev_qa_text}
 
 ## Learner's Question
 "{question}"
 
-## Your Task
-Answer their question helpfully. You have full context of what happened in the case.
-
-Guidelines:
-- Be specific - reference what actually happened in the case
-- If they're asking "why", explain the clinical reasoning
-- If they're asking about alternatives, discuss trade-offs
-- Keep it conversational, not lecture-y
-- If the question relates to teaching points, reinforce them
+""",
+      _POST_DEBRIEF_INSTRUCTIONS,
+    ])
 
-## Response Format
-Return valid JSON only:
-{{"answer": "Your helpful response", "related_teaching_points": ["Any teaching points this reinforces"]}}"""
+    # Overlap the citation lookup with the answer generation
+    citations_task = asyncio.create_task(_get_case_citations(
+      case_export.get("session_id"),
+      case_export.get("condition_display"),
+    ))
+    try:
+      response = await self._create(
+        model=self.model,
+        max_tokens=1024,
+        system=self.system_prompt,
+        messages=[{"role": "user", "content": prompt}]
+      )
+    except BaseException:
+      citations_task.cancel()
+      raise
 
-    response = self.client.messages.create(
-      model=self.model,
-      max_tokens=1024,
-      system=self.system_prompt,
-      messages=[{"role": "user", "content": prompt}]
-    )
+    try:
+      citations = await citations_task
+    except Exception:
+      citations = None
 
-    content = clean_json_response(response.content[0].text)
     try:
-      data = json.loads(content)
-      return {
+      data = parse_json_response(response.content[0].text)
+      result = {
         "answer": data.get("answer", response.content[0].text),
         "related_teaching_points": data.get("related_teaching_points", []),
-        "citations": None,
+        "citations": citations,
       }
     except json.JSONDecodeError:
-      return {
+      result = {
         "answer": response.content[0].text,
         "related_teaching_points": [],
-        "citations": None,
+        "citations": citations,
       }
 
+    if case_id:
+      await qa_cache.put(case_id, question, result, previous_qa)
+    return result
+
 
 @lru_cache
 def get_tutor() -> Tutor:
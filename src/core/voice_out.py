@@ -1,22 +1,79 @@
 """Eleven Labs TTS integration for Echo voice output."""
 
+from functools import lru_cache
 from typing import AsyncIterator, Optional
+import asyncio
 import io
+import re
 
+import httpx
 from elevenlabs import AsyncElevenLabs
 from elevenlabs.types import VoiceSettings
 
 from src.config import get_settings, ECHO_VOICES, DEFAULT_VOICE
 
 
+# Shared across requests instead of rebuilt per call
+_DEFAULT_VOICE_SETTINGS = VoiceSettings(
+  stability=0.5,
+  similarity_boost=0.75,
+  style=0.0,
+  use_speaker_boost=True,
+)
+
+# Eleven Labs latency optimization level (0-4); 3 is the strongest setting
+# that keeps the text normalizer on
+OPTIMIZE_STREAMING_LATENCY = 3
+
+# Connection pool for Eleven Labs, so concurrent TTS requests reuse TLS sessions
+ELEVEN_LABS_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+
+# Streamed audio is buffered up to this many bytes, or this long, per yield
+COALESCE_BYTES = 4096
+COALESCE_SECONDS = 0.020
+
+# End of a sentence: terminal punctuation (plus closing quotes/brackets) and
+# whitespace, but not after common abbreviations like "Dr." or "e.g."
+_SENTENCE_END = re.compile(
+  r"(?<!\bDr)(?<!\bMr)(?<!\bMs)(?<!\bMrs)(?<!\bvs)(?<!\be\.g)(?<!\bi\.e)"
+  r"[.!?][\"')\]]*\s+"
+)
+
+# Shortest text worth sending as its own TTS request
+MIN_SENTENCE_CHARS = 10
+
+
+async def _sentence_gen(text_iter: AsyncIterator[str]) -> AsyncIterator[str]:
+  """Regroup streamed text into whole sentences, flushing the tail at the end."""
+  buf = ""
+  async for piece in text_iter:
+    buf += piece
+    start = 0
+    for match in _SENTENCE_END.finditer(buf):
+      if match.end() - start >= MIN_SENTENCE_CHARS:
+        yield buf[start:match.end()]
+        start = match.end()
+    buf = buf[start:]
+  if buf.strip():
+    yield buf
+
+
+@lru_cache(maxsize=32)
+def _voice_id_for(voice: str) -> str:
+  """Map a voice name (any case) to its ID; anything else is assumed to be an ID."""
+  return ECHO_VOICES.get(voice.lower(), voice)
+
+
 class VoiceOut:
   """Eleven Labs text-to-speech service."""
 
-  def __init__(self):
+  def __init__(self, voice_settings: Optional[VoiceSettings] = None):
     settings = get_settings()
-    self.client = AsyncElevenLabs(api_key=settings.eleven_api_key)
+    self.http_client = httpx.AsyncClient(limits=ELEVEN_LABS_LIMITS, timeout=240)
+    self.client = AsyncElevenLabs(api_key=settings.eleven_api_key, httpx_client=self.http_client)
     self.model_id = settings.eleven_labs_model
     self.default_voice_id = settings.echo_voice_id
+    self.voice_settings = voice_settings or _DEFAULT_VOICE_SETTINGS
 
   async def synthesize(
     self,
@@ -34,28 +91,7 @@ class VoiceOut:
     Returns:
       Audio bytes in the specified format.
     """
-    voice_id = self._resolve_voice_id(voice)
-
-    audio_generator = await self.client.text_to_speech.convert(
-      text=text,
-      voice_id=voice_id,
-      model_id=self.model_id,
-      output_format=output_format,
-      voice_settings=VoiceSettings(
-        stability=0.5,
-        similarity_boost=0.75,
-        style=0.0,
-        use_speaker_boost=True,
-      ),
-    )
-
-    # Collect all chunks into bytes
-    chunks = []
-    async for chunk in audio_generator:
-      if isinstance(chunk, bytes):
-        chunks.append(chunk)
-
-    return b"".join(chunks)
+    return b"".join([chunk async for chunk in self.stream(text, voice, output_format)])
 
   async def stream(
     self,
@@ -70,40 +106,113 @@ class VoiceOut:
       voice: Voice name or ID. Defaults to Eryn.
       output_format: Audio format.
 
+    Yields:
+      Audio chunks as bytes.
+    """
+    async for chunk in self._tts(text, self._resolve_voice_id(voice), output_format):
+      yield chunk
+
+  async def stream_from_text_iter(
+    self,
+    text_iter: AsyncIterator[str],
+    voice: Optional[str] = None,
+    output_format: str = "mp3_44100_128",
+  ) -> AsyncIterator[bytes]:
+    """Stream speech for text that is still being generated (e.g. an LLM stream).
+
+    Text is regrouped into sentences and each one is synthesized as soon as
+    it completes, so audio starts after the first sentence rather than the
+    whole reply. The previous sentence is sent as context to keep prosody
+    continuous across requests.
+
+    Args:
+      text_iter: Async iterator of text fragments.
+      voice: Voice name or ID. Defaults to Eryn.
+      output_format: Audio format.
+
     Yields:
       Audio chunks as bytes.
     """
     voice_id = self._resolve_voice_id(voice)
+    previous_text = None
+    async for sentence in _sentence_gen(text_iter):
+      async for chunk in self._tts(sentence, voice_id, output_format, previous_text):
+        yield chunk
+      previous_text = sentence
 
-    audio_stream = await self.client.text_to_speech.convert(
+  async def _tts(
+    self,
+    text: str,
+    voice_id: str,
+    output_format: str,
+    previous_text: Optional[str] = None,
+  ) -> AsyncIterator[bytes]:
+    """Stream audio for one piece of text from the Eleven Labs streaming endpoint."""
+    audio_stream = self.client.text_to_speech.stream(
       text=text,
       voice_id=voice_id,
       model_id=self.model_id,
       output_format=output_format,
-      voice_settings=VoiceSettings(
-        stability=0.5,
-        similarity_boost=0.75,
-        style=0.0,
-        use_speaker_boost=True,
-      ),
+      voice_settings=self.voice_settings,
+      optimize_streaming_latency=OPTIMIZE_STREAMING_LATENCY,
+      previous_text=previous_text,
     )
-
-    async for chunk in audio_stream:
-      if isinstance(chunk, bytes):
-        yield chunk
+    # Coalesce small MP3 frames so each yield (and ASGI send) carries more
+    # audio. The first chunk goes out immediately to keep first-byte latency,
+    # and buffered audio is flushed once it is COALESCE_SECONDS old even if
+    # the provider pauses before the next chunk.
+    loop = asyncio.get_running_loop()
+    chunks = aiter(audio_stream)
+    buf = bytearray()
+    deadline = None
+    first = True
+    pending: Optional[asyncio.Future] = None
+    try:
+      while True:
+        if buf:
+          # Wait for the next chunk only until the buffer's deadline. The
+          # read stays pending across a flush; cancelling it would close
+          # the provider stream.
+          if pending is None:
+            pending = asyncio.ensure_future(anext(chunks))
+          done, _ = await asyncio.wait((pending,), timeout=max(0.0, deadline - loop.time()))
+          if not done:
+            yield bytes(buf)
+            buf.clear()
+            deadline = None
+            continue
+        try:
+          if pending is not None:
+            next_read, pending = pending, None
+            chunk = await next_read
+          else:
+            chunk = await anext(chunks)
+        except StopAsyncIteration:
+          break
+        if not isinstance(chunk, bytes):
+          continue
+        if first:
+          first = False
+          yield chunk
+          continue
+        buf.extend(chunk)
+        if len(buf) >= COALESCE_BYTES or (deadline is not None and loop.time() >= deadline):
+          yield bytes(buf)
+          buf.clear()
+          deadline = None
+        elif deadline is None:
+          deadline = loop.time() + COALESCE_SECONDS
+      if buf:
+        yield bytes(buf)
+    finally:
+      if pending is not None:
+        pending.cancel()
 
   def _resolve_voice_id(self, voice: Optional[str]) -> str:
     """Resolve voice name to Eleven Labs voice ID."""
-    if voice is None:
+    if voice is None or voice == self.default_voice_id:
       return self.default_voice_id
-
-    # Check if it's a voice name we know
-    voice_lower = voice.lower()
-    if voice_lower in ECHO_VOICES:
-      return ECHO_VOICES[voice_lower]
-
-    # Assume it's already a voice ID
-    return voice
+    return _voice_id_for(voice)
 
   @staticmethod
   def list_voices() -> dict[str, str]:
@@ -117,12 +226,14 @@ class VoiceOut:
 
 
 # Singleton instance
-_voice_out: Optional[VoiceOut] = None
+@lru_cache(maxsize=1)
+def get_voice_out() -> VoiceOut:
+  """Get the VoiceOut singleton."""
+  return VoiceOut()
 
 
-def get_voice_out() -> VoiceOut:
-  """Get or create the VoiceOut singleton."""
-  global _voice_out
-  if _voice_out is None:
-    _voice_out = VoiceOut()
-  return _voice_out
+async def close_voice_out() -> None:
+  """Close the VoiceOut HTTP pool, if one was created (on app shutdown)."""
+  if get_voice_out.cache_info().currsize:
+    await get_voice_out().http_client.aclose()
+    get_voice_out.cache_clear()
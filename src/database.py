@@ -1,19 +1,48 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
-if DATABASE_URL:
-    engine = create_engine(
-        DATABASE_URL,
+# Per-worker connection budget, shared by the sync and async engines
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+
+
+def pool_options(share: float) -> dict:
+    """Pool settings for an engine that gets `share` of the connection budget."""
+    return dict(
+        pool_size=max(1, round(DB_POOL_SIZE * share)),
+        max_overflow=round(DB_MAX_OVERFLOW * share),
+        pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", 30)),
         pool_recycle=300,
-        pool_pre_ping=True
+        pool_pre_ping=True,
     )
+
+
+def to_async_url(url: str) -> str:
+    """Rewrite a Postgres URL to use the asyncpg driver."""
+    scheme, sep, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql") or scheme.startswith("postgresql+"):
+        # asyncpg takes ssl=, not libpq's sslmode=
+        return f"postgresql+asyncpg{sep}{rest.replace('sslmode=', 'ssl=')}"
+    return url
+
+
+if DATABASE_URL:
+    # The budget is split so both pools together stay within it
+    engine = create_engine(DATABASE_URL, **pool_options(0.5))
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # Async engine for request paths that shouldn't block the event loop
+    async_engine = create_async_engine(to_async_url(DATABASE_URL), **pool_options(0.5))
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 else:
     engine = None
     SessionLocal = None
+    async_engine = None
+    AsyncSessionLocal = None
 
 
 class Base(DeclarativeBase):
@@ -30,10 +59,109 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def is_database_configured() -> bool:
     return DATABASE_URL is not None and engine is not None
 
 
-def create_tables():
+# Advisory lock key serializing schema setup across workers starting at once
+SCHEMA_LOCK_KEY = 0x6563686F  # "echo"
+
+
+def _create_all(conn):
+    # Workers start together; without the lock a second worker inspects the
+    # catalog before the first commits and then fails on the same ALTER
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+    Base.metadata.create_all(conn)
+    _upgrade_existing_tables(conn)
+
+
+def _upgrade_existing_tables(conn):
+    """Bring tables created by older releases up to the current models.
+
+    create_all skips tables that already exist. Only what is missing gets
+    added: columns, server defaults, and indexes. Once a database is
+    upgraded, startup only reads the catalog and takes no table locks.
+    """
+    inspector = inspect(conn)
+    ddl = conn.dialect.ddl_compiler(conn.dialect, None)
+    quote = conn.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        table_name = quote.format_table(table)
+        existing = {c["name"]: c for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.identity is not None:
+                _add_identity_column(conn, table, column)
+            elif column.name not in existing:
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS "
+                    f"{ddl.get_column_specification(column)}"
+                ))
+            elif (
+                column.server_default is not None
+                and column.identity is None
+                and existing[column.name]["default"] is None
+            ):
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ALTER COLUMN {quote.format_column(column)} "
+                    f"SET DEFAULT {ddl.get_column_default_string(column)}"
+                ))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_identity_column(conn, table, column):
+    """Add an identity column, numbering existing rows oldest first.
+
+    Adding it directly would number rows in physical order, which after
+    deletes and vacuum is not insertion order.
+    """
+    quote = conn.dialect.identifier_preparer
+    table_name = quote.format_table(table)
+    name = quote.format_column(column)
+    order_by = ", ".join(
+        quote.format_column(c)
+        for c in ([table.c.created_at] if "created_at" in table.c else []) + list(table.primary_key)
+    )
+    pk = " AND ".join(
+        f"{table_name}.{quote.format_column(c)} = numbered.{quote.format_column(c)}"
+        for c in table.primary_key
+    )
+    pk_columns = ", ".join(quote.format_column(c) for c in table.primary_key)
+
+    conn.execute(text(
+        f"ALTER TABLE {table_name} ADD COLUMN {name} {column.type.compile(dialect=conn.dialect)}"
+    ))
+    conn.execute(text(
+        f"UPDATE {table_name} SET {name} = numbered.n FROM ("
+        f"SELECT {pk_columns}, ROW_NUMBER() OVER (ORDER BY {order_by}) AS n FROM {table_name}"
+        f") AS numbered WHERE {pk}"
+    ))
+    start = conn.execute(text(f"SELECT COALESCE(MAX({name}), 0) + 1 FROM {table_name}")).scalar()
+    if not column.nullable:
+        conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {name} SET NOT NULL"))
+    conn.execute(text(
+        f"ALTER TABLE {table_name} ALTER COLUMN {name} "
+        f"ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {int(start)})"
+    ))
+
+
+async def create_tables():
+    if async_engine is not None:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(_create_all)
+
+
+async def dispose_engines():
+    """Close pooled database connections (on app shutdown)."""
+    if async_engine is not None:
+        await async_engine.dispose()
     if engine is not None:
-        Base.metadata.create_all(bind=engine)
+        engine.dispose()
@@ -1,15 +1,20 @@
-import uuid
-from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey, JSON, ARRAY, Enum
+from sqlalchemy import BigInteger, Column, Identity, String, Text, Integer, DateTime, ForeignKey, JSON, ARRAY, Enum, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from .database import Base
 
 
+# Defaults evaluated by Postgres inside the INSERT. Timestamps stay naive UTC
+# to match the utcnow() values application code compares them to.
+UTC_NOW = text("timezone('utc', now())")
+NEW_UUID = text("gen_random_uuid()")
+
+
 class User(Base):
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=NEW_UUID)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     name = Column(String(255))
@@ -17,8 +22,8 @@ class User(Base):
     role = Column(String(50), default="learner")  # learner or admin
     specialty_interest = Column(String(255))
     institution = Column(String(255))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    last_active = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
+    last_active = Column(DateTime, server_default=UTC_NOW, onupdate=func.timezone("utc", func.now()))
     preferences = Column(JSON, default=dict)
 
     case_sessions = relationship("CaseSession", back_populates="user", cascade="all, delete-orphan")
@@ -26,8 +31,15 @@ class User(Base):
 
 class CaseSession(Base):
     __tablename__ = "case_sessions"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Per-user history, newest first (case history, admin filters)
+        Index("ix_case_sessions_user_created", "user_id", "created_at"),
+        Index("ix_case_sessions_status", "status"),
+        Index("ix_case_sessions_condition_key", "condition_key"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=NEW_UUID)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
     condition_key = Column(String(255), nullable=False)
     condition_display = Column(String(255), nullable=False)
@@ -36,7 +48,7 @@ class CaseSession(Base):
     phase = Column(String(50), default="intro")
     visit_type = Column(String(50), default="sick")  # "sick" or "well_child"
     visit_age_months = Column(Integer, nullable=True)
-    started_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, server_default=UTC_NOW)
     completed_at = Column(DateTime, nullable=True)
     duration_seconds = Column(Integer, nullable=True)
     history_gathered = Column(ARRAY(Text), default=list)
@@ -53,7 +65,7 @@ class CaseSession(Base):
     screening_tools_used = Column(ARRAY(Text), default=list)
     learning_materials = Column(JSON, nullable=True)
     debrief_summary = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
 
     user = relationship("User", back_populates="case_sessions")
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
@@ -61,13 +73,21 @@ class CaseSession(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Transcript loads: all messages of a session in order
+        Index("ix_messages_session_seq", "session_id", "seq"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=NEW_UUID)
     session_id = Column(UUID(as_uuid=True), ForeignKey("case_sessions.id", ondelete="CASCADE"), nullable=False)
     role = Column(String(50), nullable=False)
     content = Column(Text, nullable=False)
     phase = Column(String(50), nullable=True)
     metadata_ = Column("metadata", JSON, default=dict)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, server_default=UTC_NOW)
+    # Insertion order. A turn's messages share one transaction, and so one
+    # now(), so created_at can't order them.
+    seq = Column(BigInteger, Identity(), nullable=False)
 
     session = relationship("CaseSession", back_populates="messages")
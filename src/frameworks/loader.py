@@ -2,10 +2,18 @@
 
 import os
 import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import yaml
 
+# LibYAML's C parser when available; several times faster than pure Python
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 try:
     import httpx
     _HAS_HTTPX = True
@@ -13,11 +21,27 @@ except ImportError:
     _HAS_HTTPX = False
 
 
+# Shared by every importer; filled in place on first use, never rebound
 FRAMEWORKS: dict[str, dict] = {}
-_loaded = False
+
+# Lowercased key/topic/alias -> framework key, built alongside FRAMEWORKS
+_LOOKUP: dict[str, str] = {}
+
+# Category -> framework keys, in load order
+_BY_CATEGORY: dict[str, list[str]] = {}
 
 ATHENA_URL = os.environ.get("ATHENA_URL", "http://localhost:9105")
 
+DEFAULT_SPECIALTY = "pediatrics"
+
+# Specialty FRAMEWORKS currently holds, and a counter bumped on every
+# (re)load so caches derived from FRAMEWORKS can tell they are stale
+_loaded_specialty: Optional[str] = None
+_generation = 0
+
+# Threads used to read framework YAML files on cold start
+LOAD_WORKERS = 8
+
 
 def _load_from_athena(specialty: str = "pediatrics") -> dict[str, dict]:
     """Try loading frameworks from Athena service."""
@@ -37,6 +61,15 @@ def _load_from_athena(specialty: str = "pediatrics") -> dict[str, dict]:
         return {}
 
 
+def _load_file(file: Path) -> Optional[dict]:
+    """Parse one framework YAML file, or None if it is unreadable."""
+    try:
+        data = yaml.load(file.read_bytes(), Loader=_Loader)
+    except Exception:
+        return None
+    return data if data and isinstance(data, dict) else None
+
+
 def _load_from_local() -> dict[str, dict]:
     """Load frameworks from local YAML directory."""
     frameworks = {}
@@ -46,48 +79,62 @@ def _load_from_local() -> dict[str, dict]:
     if not framework_dir.exists():
         return frameworks
 
-    for file in framework_dir.glob("*.yaml"):
-        if file.name.startswith("_"):
-            continue
-        try:
-            with open(file) as f:
-                data = yaml.safe_load(f)
-                if data and isinstance(data, dict):
-                    frameworks[file.stem] = data
-        except Exception:
-            continue
+    files = [f for f in framework_dir.glob("*.yaml") if not f.name.startswith("_")]
+
+    # Overlap file reads across threads; map keeps glob order
+    with ThreadPoolExecutor(max_workers=min(LOAD_WORKERS, len(files) or 1)) as pool:
+        for file, data in zip(files, pool.map(_load_file, files)):
+            if data is not None:
+                frameworks[file.stem] = data
 
     return frameworks
 
 
-def load_frameworks(reload: bool = False, specialty: str = "pediatrics") -> dict[str, dict]:
+@lru_cache(maxsize=1)
+def _frameworks_singleton(specialty: str) -> dict[str, dict]:
+    """Load frameworks once per process — Athena first, then local YAML."""
+    global _loaded_specialty, _generation
+    FRAMEWORKS.clear()
+    FRAMEWORKS.update(_load_from_athena(specialty) or _load_from_local())
+
+    # Earlier frameworks win on collisions, as in the old linear scan
+    _LOOKUP.clear()
+    _BY_CATEGORY.clear()
+    for key, fw in FRAMEWORKS.items():
+        _BY_CATEGORY.setdefault(fw.get("category", "unknown"), []).append(key)
+        _LOOKUP.setdefault(key, key)
+        topic = fw.get("topic")
+        if topic:
+            _LOOKUP.setdefault(topic.lower(), key)
+        for alias in fw.get("aliases", []):
+            _LOOKUP.setdefault(alias.lower(), key)
+
+    # Prompts built from the previous set are now stale
+    _build_case_prompt_cached.cache_clear()
+    _loaded_specialty = specialty
+    _generation += 1
+    return FRAMEWORKS
+
+
+def load_frameworks(reload: bool = False, specialty: Optional[str] = None) -> dict[str, dict]:
     """Load all teaching frameworks — tries Athena first, falls back to local.
 
+    Frameworks are loaded once (at app startup, or on first use) and cached;
+    later calls return the same dict without touching Athena or disk.
+    There is one shared set: loading another specialty replaces it for
+    every caller.
+
     Args:
         reload: Force reload even if already loaded
-        specialty: Specialty to load (pediatrics, internal_medicine, family_practice)
+        specialty: Specialty to load (pediatrics, internal_medicine,
+            family_practice); defaults to the one already loaded
 
     Returns:
         Dictionary mapping framework keys to framework data
     """
-    global FRAMEWORKS, _loaded
-
-    if _loaded and not reload:
-        return FRAMEWORKS
-
-    FRAMEWORKS.clear()
-
-    # Try Athena first
-    athena_fws = _load_from_athena(specialty)
-    if athena_fws:
-        FRAMEWORKS = athena_fws
-        _loaded = True
-        return FRAMEWORKS
-
-    # Fall back to local
-    FRAMEWORKS = _load_from_local()
-    _loaded = True
-    return FRAMEWORKS
+    if reload:
+        _frameworks_singleton.cache_clear()
+    return _frameworks_singleton(specialty or _loaded_specialty or DEFAULT_SPECIALTY)
 
 
 def get_framework(key: str) -> Optional[dict]:
@@ -99,9 +146,7 @@ def get_framework(key: str) -> Optional[dict]:
     Returns:
         Framework data or None if not found
     """
-    if not _loaded:
-        load_frameworks()
-    return FRAMEWORKS.get(key)
+    return load_frameworks().get(key)
 
 
 def find_framework(condition_name: str) -> Optional[dict]:
@@ -113,23 +158,11 @@ def find_framework(condition_name: str) -> Optional[dict]:
     Returns:
         Framework data or None if not found
     """
-    if not _loaded:
-        load_frameworks()
-    
+    frameworks = load_frameworks()
+
     condition_lower = condition_name.lower()
-    
-    for key, framework in FRAMEWORKS.items():
-        if key == condition_lower.replace(" ", "_"):
-            return framework
-        
-        if framework.get("topic", "").lower() == condition_lower:
-            return framework
-        
-        aliases = [a.lower() for a in framework.get("aliases", [])]
-        if condition_lower in aliases:
-            return framework
-    
-    return None
+    key = _LOOKUP.get(condition_lower) or _LOOKUP.get(condition_lower.replace(" ", "_"))
+    return frameworks.get(key) if key else None
 
 
 def get_frameworks_by_category(category: str) -> list[dict]:
@@ -141,14 +174,30 @@ def get_frameworks_by_category(category: str) -> list[dict]:
     Returns:
         List of frameworks in the category with their keys
     """
-    if not _loaded:
-        load_frameworks()
-    
-    return [
-        {"key": k, **v}
-        for k, v in FRAMEWORKS.items()
-        if v.get("category") == category
-    ]
+    frameworks = load_frameworks()
+    return [{"key": k, **frameworks[k]} for k in _BY_CATEGORY.get(category, ())]
+
+
+def get_category_keys(category: str) -> list[str]:
+    """Get the keys of the frameworks in a category, in load order."""
+    load_frameworks()
+    return list(_BY_CATEGORY.get(category, ()))
+
+
+def get_category_counts() -> dict[str, int]:
+    """Get the number of frameworks in each category, in load order."""
+    load_frameworks()
+    return {category: len(keys) for category, keys in _BY_CATEGORY.items()}
+
+
+def frameworks_generation() -> int:
+    """Get a counter that changes each time frameworks are (re)loaded.
+
+    Callers that cache data derived from the frameworks compare it to
+    tell whether their copy is stale.
+    """
+    load_frameworks()
+    return _generation
 
 
 def get_well_child_frameworks() -> list[dict]:
@@ -157,14 +206,7 @@ def get_well_child_frameworks() -> list[dict]:
     Returns:
         List of well-child frameworks with their keys
     """
-    if not _loaded:
-        load_frameworks()
-
-    return [
-        {"key": k, **v}
-        for k, v in FRAMEWORKS.items()
-        if v.get("category") == "well_child"
-    ]
+    return get_frameworks_by_category("well_child")
 
 
 def get_well_child_by_age(age_months: int) -> Optional[dict]:
@@ -176,21 +218,18 @@ def get_well_child_by_age(age_months: int) -> Optional[dict]:
     Returns:
         Framework data or None if no matching visit age
     """
-    if not _loaded:
-        load_frameworks()
+    frameworks = load_frameworks()
 
-    for key, fw in FRAMEWORKS.items():
-        if fw.get("category") == "well_child" and fw.get("visit_age_months") == age_months:
-            return fw
+    for key in _BY_CATEGORY.get("well_child", ()):
+        if frameworks[key].get("visit_age_months") == age_months:
+            return frameworks[key]
 
     return None
 
 
 def get_all_framework_keys() -> list[str]:
     """Get list of all available framework keys."""
-    if not _loaded:
-        load_frameworks()
-    return list(FRAMEWORKS.keys())
+    return list(load_frameworks().keys())
 
 
 def get_random_framework() -> tuple[str, dict]:
@@ -199,8 +238,7 @@ def get_random_framework() -> tuple[str, dict]:
     Returns:
         Tuple of (key, framework_data)
     """
-    if not _loaded:
-        load_frameworks()
+    load_frameworks()
     
     if not FRAMEWORKS:
         return ("", {})
@@ -236,6 +274,11 @@ def get_teaching_context(condition_key: str) -> dict:
     }
 
 
+def _bullets(items: list) -> str:
+    """Format a list as prompt bullet lines."""
+    return "\n".join(f"- {item}" for item in items) if items else "- None specified"
+
+
 def build_case_prompt(condition_key: str, learner_level: str = "student") -> str:
     """Build prompt for Claude to generate a case.
     
@@ -246,6 +289,14 @@ def build_case_prompt(condition_key: str, learner_level: str = "student") -> str
     Returns:
         Formatted prompt string
     """
+    return _build_case_prompt_cached(condition_key, learner_level)
+
+
+# Frameworks don't change after load, so each (condition, level) prompt is
+# built once; sized for every framework at a few learner levels.
+@lru_cache(maxsize=256)
+def _build_case_prompt_cached(condition_key: str, learner_level: str) -> str:
+    """Build the case prompt for a condition and learner level."""
     framework = get_framework(condition_key)
     
     if not framework:
@@ -258,25 +309,25 @@ def build_case_prompt(condition_key: str, learner_level: str = "student") -> str
 Generate a pediatric case for teaching {framework.get('topic', condition_key)}.
 
 TEACHING GOALS (what learner should understand):
-{yaml.dump(framework.get('teaching_goals', []), default_flow_style=False)}
+{_bullets(framework.get('teaching_goals', []))}
 
 COMMON MISTAKES TO ADDRESS:
-{yaml.dump(framework.get('common_mistakes', []), default_flow_style=False)}
+{_bullets(framework.get('common_mistakes', []))}
 
 RED FLAGS (must be recognized):
-{yaml.dump(framework.get('red_flags', []), default_flow_style=False)}
+{_bullets(framework.get('red_flags', []))}
 
 CLINICAL PEARLS (high-yield points):
-{yaml.dump(framework.get('clinical_pearls', []), default_flow_style=False)}
+{_bullets(framework.get('clinical_pearls', []))}
 
 KEY HISTORY QUESTIONS:
-{yaml.dump(framework.get('key_history_questions', []), default_flow_style=False)}
+{_bullets(framework.get('key_history_questions', []))}
 
 KEY EXAM FINDINGS:
-{yaml.dump(framework.get('key_exam_findings', []), default_flow_style=False)}
+{_bullets(framework.get('key_exam_findings', []))}
 
 TREATMENT PRINCIPLES:
-{yaml.dump(framework.get('treatment_principles', []), default_flow_style=False)}
+{_bullets(framework.get('treatment_principles', []))}
 
 LEARNER LEVEL: {learner_level}
 AGE RANGE: {age_range[0]}-{age_range[1]} months
@@ -284,6 +335,3 @@ AGE RANGE: {age_range[0]}-{age_range[1]} months
 Generate a realistic patient presentation within this age range.
 Include parent personality from: {parent_styles}
 """
-
-
-load_frameworks()
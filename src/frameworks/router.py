@@ -4,7 +4,7 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from .loader import (
-    FRAMEWORKS,
+    get_category_counts,
     get_framework,
     get_frameworks_by_category,
     load_frameworks,
@@ -12,8 +12,6 @@ from .loader import (
 
 router = APIRouter(prefix="/frameworks", tags=["frameworks"])
 
-load_frameworks()
-
 
 class FrameworkSummary(BaseModel):
     key: str
@@ -40,8 +38,9 @@ class CategoryResponse(BaseModel):
 @router.get("", response_model=FrameworkListResponse)
 async def list_frameworks():
     """List all available teaching frameworks."""
+    frameworks = load_frameworks()
     return {
-        "count": len(FRAMEWORKS),
+        "count": len(frameworks),
         "frameworks": [
             {
                 "key": k,
@@ -49,7 +48,7 @@ async def list_frameworks():
                 "category": v.get("category", "unknown"),
                 "age_range": v.get("age_range_months", [0, 216]),
             }
-            for k, v in sorted(FRAMEWORKS.items())
+            for k, v in sorted(frameworks.items())
         ],
     }
 
@@ -57,15 +56,10 @@ async def list_frameworks():
 @router.get("/categories")
 async def list_categories():
     """List all available categories with counts."""
-    categories: dict[str, int] = {}
-    for v in FRAMEWORKS.values():
-        cat = v.get("category", "unknown")
-        categories[cat] = categories.get(cat, 0) + 1
-    
     return {
         "categories": [
-            {"name": k, "count": v}
-            for k, v in sorted(categories.items())
+            {"name": k, "count": count}
+            for k, count in sorted(get_category_counts().items())
         ]
     }
 
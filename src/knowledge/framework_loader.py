@@ -5,49 +5,70 @@ This module loads and provides access to the 100 pediatric condition
 teaching frameworks used for dynamic case generation.
 """
 
-import yaml
-from pathlib import Path
+from dataclasses import dataclass
 from typing import Optional
 
+from src.frameworks import loader as _fw
+
+
+# List fields copied into a teaching context
+_TEACHING_CONTEXT_LISTS = (
+    "teaching_goals",
+    "common_mistakes",
+    "red_flags",
+    "clinical_pearls",
+    "key_history_questions",
+    "key_exam_findings",
+    "treatment_principles",
+    "disposition_guidance",
+    "parent_styles",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TeachingContext:
+    """Teaching fields of a framework, as used in prompts."""
+    topic: Optional[str]
+    teaching_goals: list
+    common_mistakes: list
+    red_flags: list
+    clinical_pearls: list
+    key_history_questions: list
+    key_exam_findings: list
+    treatment_principles: list
+    disposition_guidance: list
+    parent_styles: list
+    images: list
+
 
 class FrameworkLoader:
     """Load and query teaching frameworks."""
 
-    def __init__(self, framework_dir: str = "knowledge/frameworks"):
-        self.framework_dir = Path(framework_dir)
+    __slots__ = ("_frameworks", "_teaching_contexts", "_case_prompts", "_generation")
+
+    def __init__(self):
         self._frameworks: dict = {}
-        self._by_category: dict = {}
-        self._alias_map: dict = {}
+        # key -> teaching context, built once at load
+        self._teaching_contexts: dict[str, TeachingContext] = {}
+        # (key, learner_level) -> case prompt; frameworks are fixed after load
+        self._case_prompts: dict[tuple[str, str], str] = {}
         self._load_all()
 
     def _load_all(self):
-        """Load all framework YAML files."""
-        if not self.framework_dir.exists():
-            raise FileNotFoundError(f"Framework directory not found: {self.framework_dir}")
-
-        for file in self.framework_dir.glob("*.yaml"):
-            if file.name.startswith("_"):
-                continue
-
-            try:
-                with open(file, "r") as f:
-                    data = yaml.safe_load(f)
-
-                key = file.stem
-                self._frameworks[key] = data
-
-                # Index by category
-                category = data.get("category", "other")
-                if category not in self._by_category:
-                    self._by_category[category] = []
-                self._by_category[category].append(key)
-
-                # Index aliases
-                for alias in data.get("aliases", []):
-                    self._alias_map[alias.lower()] = key
-
-            except Exception as e:
-                print(f"Warning: Failed to load {file}: {e}")
+        """Use the shared frameworks and indexes built by src.frameworks.loader."""
+        self._frameworks = _fw.load_frameworks()
+        self._generation = _fw.frameworks_generation()
+
+        for key, data in self._frameworks.items():
+            # Teaching context, with PLACEHOLDER images filtered out once
+            self._teaching_contexts[key] = TeachingContext(
+                topic=data.get("topic"),
+                images=[
+                    img for img in data.get("images", [])
+                    if img.get("url") and img.get("url") != "PLACEHOLDER"
+                ],
+                **{field: data.get(field, []) for field in _TEACHING_CONTEXT_LISTS},
+            )
 
     def get(self, key: str) -> Optional[dict]:
         """Get framework by key (filename without .yaml)."""
@@ -62,25 +83,16 @@ class FrameworkLoader:
         if key in self._frameworks:
             return self._frameworks[key]
 
-        # Try alias match
-        if name_lower in self._alias_map:
-            return self._frameworks[self._alias_map[name_lower]]
-
-        # Try topic name match
-        for fw in self._frameworks.values():
-            if fw.get("topic", "").lower() == name_lower:
-                return fw
-
-        return None
+        # Try alias or topic match
+        return _fw.find_framework(name)
 
     def get_by_category(self, category: str) -> list[dict]:
         """Get all frameworks in a category."""
-        keys = self._by_category.get(category, [])
-        return [self._frameworks[k] for k in keys]
+        return [self._frameworks[k] for k in _fw.get_category_keys(category)]
 
     def get_categories(self) -> list[str]:
         """Get list of all categories."""
-        return list(self._by_category.keys())
+        return list(_fw.get_category_counts())
 
     def get_all_keys(self) -> list[str]:
         """Get all framework keys."""
@@ -91,7 +103,7 @@ class FrameworkLoader:
         import random
 
         if category:
-            keys = self._by_category.get(category, [])
+            keys = _fw.get_category_keys(category)
         else:
             keys = list(self._frameworks.keys())
 
@@ -114,41 +126,27 @@ class FrameworkLoader:
         """Get summary statistics."""
         return {
             "total_frameworks": len(self._frameworks),
-            "categories": {
-                cat: len(keys) for cat, keys in self._by_category.items()
-            },
-            "total_aliases": len(self._alias_map),
+            "categories": _fw.get_category_counts(),
+            "total_aliases": len({
+                alias.lower()
+                for fw in self._frameworks.values()
+                for alias in fw.get("aliases", [])
+            }),
         }
 
-    def get_teaching_context(self, key: str) -> dict:
+    def get_teaching_context(self, key: str) -> Optional[TeachingContext]:
         """Get teaching context for a framework (for prompts)."""
-        fw = self.get(key)
-        if not fw:
-            return {}
-
-        # Filter images to only include those with valid URLs (not PLACEHOLDER)
-        raw_images = fw.get("images", [])
-        valid_images = [
-            img for img in raw_images
-            if img.get("url") and img.get("url") != "PLACEHOLDER"
-        ]
-
-        return {
-            "topic": fw.get("topic"),
-            "teaching_goals": fw.get("teaching_goals", []),
-            "common_mistakes": fw.get("common_mistakes", []),
-            "red_flags": fw.get("red_flags", []),
-            "clinical_pearls": fw.get("clinical_pearls", []),
-            "key_history_questions": fw.get("key_history_questions", []),
-            "key_exam_findings": fw.get("key_exam_findings", []),
-            "treatment_principles": fw.get("treatment_principles", []),
-            "disposition_guidance": fw.get("disposition_guidance", []),
-            "parent_styles": fw.get("parent_styles", []),
-            "images": valid_images,
-        }
+        return self._teaching_contexts.get(key)
 
     def build_case_prompt(self, key: str, learner_level: str = "student") -> str:
         """Build a case generation prompt using framework context."""
+        prompt = self._case_prompts.get((key, learner_level))
+        if prompt is None:
+            prompt = self._case_prompts[(key, learner_level)] = self._build_case_prompt(key, learner_level)
+        return prompt
+
+    def _build_case_prompt(self, key: str, learner_level: str) -> str:
+        """Render the case generation prompt for a framework."""
         fw = self.get(key)
         if not fw:
             return "Generate a general pediatric case."
@@ -200,9 +198,9 @@ _loader: Optional[FrameworkLoader] = None
 
 
 def get_frameworks() -> FrameworkLoader:
-    """Get the singleton FrameworkLoader instance."""
+    """Get the singleton FrameworkLoader instance, rebuilt if frameworks reloaded."""
     global _loader
-    if _loader is None:
+    if _loader is None or _loader._generation != _fw.frameworks_generation():
         _loader = FrameworkLoader()
     return _loader
 
@@ -218,7 +216,7 @@ def find_framework(name: str) -> Optional[dict]:
     return get_frameworks().find(name)
 
 
-def get_teaching_context(key: str) -> dict:
+def get_teaching_context(key: str) -> Optional[TeachingContext]:
     """Get teaching context for a condition."""
     return get_frameworks().get_teaching_context(key)
 
@@ -1,22 +1,28 @@
 """Echo - AI Attending Tutor Service."""
 
+import asyncio
 import os
 from pathlib import Path
 
 import anthropic
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.websockets import WebSocketClose
 
 from .config import get_settings
+from .core.tutor import close_anthropic_http_client
+from .core.voice_out import close_voice_out
 from .routers import feedback, question, debrief, voice
 from .cases import case_router
 from .auth.router import router as auth_router
 from .admin.router import router as admin_router
 from .patients.router import router as patients_router
+from .frameworks.loader import load_frameworks
 from .frameworks.router import router as frameworks_router
-from .database import is_database_configured, create_tables
+from .database import is_database_configured, create_tables, dispose_engines
 
 app = FastAPI(
   title="Echo",
@@ -105,15 +111,49 @@ async def startup():
       file=sys.stderr,
     )
 
+  # Load frameworks now, off the event loop, so the first case or
+  # framework request doesn't block the worker on Athena and YAML parsing
+  frameworks = await asyncio.to_thread(load_frameworks)
+  print(f"Loaded {len(frameworks)} teaching frameworks.")
+
   if is_database_configured():
-    create_tables()
+    await create_tables()
     print("Database tables created/verified.")
   else:
     print("Database not configured - running without persistence.")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+  """Release pooled upstream and database connections."""
+  await close_anthropic_http_client()
+  await close_voice_out()
+  await dispose_engines()
+
+
 STATIC_DIR = Path(__file__).parent.parent / "web" / "dist"
 
+
+class SPAStaticFiles(StaticFiles):
+  """StaticFiles that falls back to index.html for client-side routes."""
+
+  async def __call__(self, scope, receive, send) -> None:
+    # Mounted at "/", so websockets to unknown paths land here too;
+    # StaticFiles only speaks HTTP, so reject them as the router would
+    if scope["type"] == "websocket":
+      await WebSocketClose()(scope, receive, send)
+      return
+    await super().__call__(scope, receive, send)
+
+  async def get_response(self, path: str, scope) -> Response:
+    try:
+      return await super().get_response(path, scope)
+    except StarletteHTTPException as e:
+      if e.status_code != 404:
+        raise
+      return await super().get_response("index.html", scope)
+
+
 @app.get("/")
 async def root():
   """Root endpoint - serve frontend in production, API info in dev."""
@@ -140,22 +180,9 @@ async def health():
   }
 
 
-# Serve static frontend files in production
+# Serve static frontend files in production. Mounted last so API routes win.
 if STATIC_DIR.exists():
-  # Mount assets directory for static files (JS, CSS, images)
-  assets_dir = STATIC_DIR / "assets"
-  if assets_dir.exists():
-    app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
-  
-  @app.get("/{full_path:path}")
-  async def serve_spa(request: Request, full_path: str):
-    """Serve the SPA for all non-API routes."""
-    # Check if requesting a static file
-    file_path = STATIC_DIR / full_path
-    if file_path.is_file():
-      return FileResponse(file_path)
-    # Otherwise return index.html for SPA routing
-    return FileResponse(STATIC_DIR / "index.html")
+  app.mount("/", SPAStaticFiles(directory=str(STATIC_DIR), html=True), name="spa")
 
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ from .context import (
   EncounterContext,
   WidgetPatientContext,
   FlexiblePatientContext,
+  NormalizedPatientContext,
   normalize_patient_context,
 )
 from .feedback import FeedbackRequest, FeedbackResponse, QuestionRequest, DebriefRequest
@@ -14,6 +15,7 @@ __all__ = [
   "EncounterContext",
   "WidgetPatientContext",
   "FlexiblePatientContext",
+  "NormalizedPatientContext",
   "normalize_patient_context",
   "FeedbackRequest",
   "FeedbackResponse",
@@ -1,7 +1,9 @@
 """Context models shared across platforms."""
 
-from typing import Any, Optional, Literal, Union
-from pydantic import BaseModel, field_validator, model_validator
+from typing import Annotated, Any, Optional, Literal, Union
+from pydantic import (
+  AfterValidator, BaseModel, Discriminator, Field, PrivateAttr, Tag, field_validator, model_validator,
+)
 from datetime import date, datetime
 
 
@@ -57,7 +59,7 @@ class EncounterSummary(BaseModel):
   date: date
   type: str
   chief_complaint: str
-  diagnoses: list[str] = []
+  diagnoses: list[str] = Field(default_factory=list)
   provider: Optional[str] = None
 
   @field_validator("date", mode="before")
@@ -80,15 +82,25 @@ class PatientContext(BaseModel):
   sex: Optional[str] = None
 
   # Clinical data
-  problem_list: list[Condition] = []
-  medication_list: list[Medication] = []
-  allergy_list: list[Allergy] = []
-  recent_encounters: list[EncounterSummary] = []
+  problem_list: list[Condition] = Field(default_factory=list)
+  medication_list: list[Medication] = Field(default_factory=list)
+  allergy_list: list[Allergy] = Field(default_factory=list)
+  recent_encounters: list[EncounterSummary] = Field(default_factory=list)
 
   # Optional extended context
   family_history: Optional[str] = None
   social_history: Optional[str] = None
 
+  # Prompt text rendered by the tutor, reused across calls for this patient.
+  # Reassigning a field clears it; mutating a list in place does not, so
+  # treat the lists as read-only once the context is in use.
+  _prompt_context: Optional[str] = PrivateAttr(default=None)
+
+  def __setattr__(self, name: str, value: Any) -> None:
+    super().__setattr__(name, value)
+    if name in PatientContext.model_fields:
+      self._prompt_context = None
+
   @property
   def age_display(self) -> str:
     """Human-readable age."""
@@ -111,13 +123,13 @@ class EncounterContext(BaseModel):
   phase: str  # "history", "exam", "assessment", "plan"
 
   # What's happened so far
-  history_gathered: list[str] = []
-  exam_findings: list[str] = []
-  differential: list[str] = []
-  orders_placed: list[str] = []
+  history_gathered: list[str] = Field(default_factory=list)
+  exam_findings: list[str] = Field(default_factory=list)
+  differential: list[str] = Field(default_factory=list)
+  orders_placed: list[str] = Field(default_factory=list)
 
   # Errors detected (for Syrinx error injection scenarios)
-  known_errors: list[str] = []
+  known_errors: list[str] = Field(default_factory=list)
 
 
 class WidgetPatientContext(BaseModel):
@@ -147,9 +159,10 @@ class WidgetPatientContext(BaseModel):
       name=self.name or "Unknown",
       age_years=self.age,
       sex=self.sex,
-      problem_list=[Condition(display_name=p) for p in (self.problemList or [])],
-      medication_list=[Medication(display_name=m) for m in (self.medications or [])],
-      allergy_list=[Allergy(display_name=a) for a in (self.allergies or [])],
+      # Plain dicts, so the items are built inside PatientContext's validator
+      problem_list=[{"display_name": p} for p in (self.problemList or [])],
+      medication_list=[{"display_name": m} for m in (self.medications or [])],
+      allergy_list=[{"display_name": a} for a in (self.allergies or [])],
     )
 
 
@@ -157,6 +170,23 @@ class WidgetPatientContext(BaseModel):
 FlexiblePatientContext = Union[PatientContext, WidgetPatientContext]
 
 
+def _patient_shape(value: Any) -> str:
+  """Tag a patient payload: widget payloads carry camelCase patientId."""
+  if isinstance(value, dict):
+    return "widget" if "patientId" in value else "standard"
+  return "widget" if isinstance(value, WidgetPatientContext) else "standard"
+
+
+# Either format, picked by shape in one pass and always validated to PatientContext
+NormalizedPatientContext = Annotated[
+  Union[
+    Annotated[PatientContext, Tag("standard")],
+    Annotated[WidgetPatientContext, AfterValidator(WidgetPatientContext.to_patient_context), Tag("widget")],
+  ],
+  Discriminator(_patient_shape),
+]
+
+
 def normalize_patient_context(patient: Optional[FlexiblePatientContext]) -> Optional[PatientContext]:
   """Convert any patient context format to the standard PatientContext.
 
@@ -1,16 +1,18 @@
 """C-CDA XML parser for patient data extraction."""
 
+from collections import OrderedDict
 from datetime import date, datetime
-from typing import Optional, List, Tuple
-from xml.etree import ElementTree as ET
-
-from .models import (
-  ImportedPatient,
-  Problem,
-  Medication,
-  Allergy,
-  Encounter,
-)
+from functools import lru_cache
+from io import BytesIO
+from typing import BinaryIO, Iterator, Optional, List, Tuple, Union
+import hashlib
+import sys
+import threading
+import uuid
+
+from lxml import etree
+
+from .models import ImportedPatient
 
 
 # C-CDA namespaces
@@ -20,44 +22,225 @@ NS = {
   "xsi": "http://www.w3.org/2001/XMLSchema-instance",
 }
 
+_NS = NS[""]
+
+# Code system OIDs -> human-readable names
+CODE_SYSTEM_NAMES = {
+  "2.16.840.1.113883.6.96": "SNOMED-CT",
+  "2.16.840.1.113883.6.90": "ICD-10-CM",
+  "2.16.840.1.113883.6.88": "RxNorm",
+  "2.16.840.1.113883.6.1": "LOINC",
+  "2.16.840.1.113883.6.69": "NDC",
+}
+
+# Section template IDs and LOINC codes -> ImportedPatient list they fill
+SECTION_KEYS = {
+  "2.16.840.1.113883.10.20.22.2.5": "problems",
+  "11450-4": "problems",
+  "2.16.840.1.113883.10.20.22.2.1": "medications",
+  "10160-0": "medications",
+  "2.16.840.1.113883.10.20.22.2.6": "allergies",
+  "48765-2": "allergies",
+  "2.16.840.1.113883.10.20.22.2.22": "encounters",
+  "46240-8": "encounters",
+}
+
+# Parsed documents kept for re-uploads of the same file, keyed by content hash
+PARSE_CACHE_SIZE = 128
+_parse_cache: OrderedDict[tuple, Tuple[ImportedPatient, List[str]]] = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+# Bytes read at a time when hashing an uploaded file
+READ_CHUNK_SIZE = 1 << 20
+
+# XPath prefix for the default HL7 namespace
+NSMAP = {"hl7": _NS}
+
+# Parser options for uploaded files: no entity expansion or network access.
+# Uploads must be UTF-8, so ignore any encoding in the declaration.
+# Pretty-printed indentation nodes and the xml:id table are never read.
+_PARSE_OPTIONS = dict(
+  encoding="utf-8",
+  resolve_entities=False,
+  no_network=True,
+  huge_tree=False,
+  remove_blank_text=True,
+  collect_ids=False,
+)
+
+
+def _tag(name: str) -> str:
+  """Braced, interned tag name in the HL7 namespace."""
+  return sys.intern(f"{{{_NS}}}{name}")
+
+
+# Tags watched while stream-parsing the document body
+COMPONENT_TAG = _tag("component")
+STRUCTURED_BODY_TAG = _tag("structuredBody")
+SECTION_TAG = _tag("section")
+
+# Tags used to pick nodes out of the field unions below
+CODE_TAG = _tag("code")
+VALUE_TAG = _tag("value")
+STATUS_CODE_TAG = _tag("statusCode")
+EFFECTIVE_TIME_TAG = _tag("effectiveTime")
+LOW_TAG = _tag("low")
+DOSE_QUANTITY_TAG = _tag("doseQuantity")
+ROUTE_CODE_TAG = _tag("routeCode")
+
+
+def _xpath(path: str) -> etree.XPath:
+  """Compile an XPath against the HL7 namespace."""
+  return etree.XPath(path, namespaces=NSMAP)
+
+
+def _first(xpath: etree.XPath, elem):
+  """First node matched by a compiled XPath, or None."""
+  nodes = xpath(elem)
+  return nodes[0] if nodes else None
+
+
+# Compiled once at import. "(...)[1]" and "descendant::x[1]" keep
+# ElementTree's find() semantics: the first match in document order.
+XP_PATIENT = _xpath("(hl7:recordTarget/hl7:patientRole)[1]/hl7:patient[1]")
+XP_TEMPLATE_IDS = _xpath("hl7:templateId/@root")
+XP_SECTION_CODE = _xpath("string(hl7:code[1]/@code)")
+
+XP_NAME = _xpath("hl7:name[1]")
+XP_GIVEN = _xpath("hl7:given[1]")
+XP_FAMILY = _xpath("hl7:family[1]")
+XP_BIRTH_TIME = _xpath("hl7:birthTime[1]")
+XP_ADMIN_GENDER = _xpath("hl7:administrativeGenderCode[1]")
+
+# Per section: one node per entry (its first act's first observation, etc.)
+XP_ENTRY_OBSERVATIONS = _xpath(
+  ".//hl7:entry/descendant::hl7:act[1]/descendant::hl7:observation[1]"
+)
+XP_ENTRY_SUBSTANCE_ADMINS = _xpath(".//hl7:entry/descendant::hl7:substanceAdministration[1]")
+XP_ENTRY_ENCOUNTERS = _xpath(".//hl7:entry/descendant::hl7:encounter[1]")
+
+# Per entry: every field node in one pass, told apart by tag
+XP_PROBLEM_FIELDS = _xpath(
+  "hl7:value[1]"
+  " | descendant::hl7:statusCode[1]"
+  " | hl7:effectiveTime[1]/hl7:low[1]"
+)
+XP_MEDICATION_FIELDS = _xpath(
+  "descendant::hl7:consumable[1]/descendant::hl7:manufacturedProduct[1]"
+  "/descendant::hl7:manufacturedMaterial[1]/hl7:code[1]"
+  " | descendant::hl7:doseQuantity[1]"
+  " | descendant::hl7:routeCode[1]"
+  " | hl7:statusCode[1]"
+)
+XP_ALLERGY_FIELDS = _xpath(
+  "descendant::hl7:participant[1]/descendant::hl7:participantRole[1]"
+  "/descendant::hl7:playingEntity[1]/hl7:code[1]"
+  " | descendant::hl7:entryRelationship[hl7:observation][1]/hl7:observation[1]/hl7:value[1]"
+)
+# Also a value, so it can't share the union above
+XP_SEVERITY_VALUE = _xpath(
+  "descendant::hl7:entryRelationship[@typeCode='SUBJ'][hl7:observation][1]"
+  "/hl7:observation[1]/hl7:value[1]"
+)
+XP_ENCOUNTER_FIELDS = _xpath(
+  "hl7:effectiveTime[1]"
+  " | hl7:code[1]"
+  " | descendant::hl7:entryRelationship[1]/descendant::hl7:observation[1]/hl7:value[1]"
+)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+  """Intern a coded value or display name.
+
+  The same handful of codes and names ("Asthma", "active", "Oral") recur
+  across entries and patients, and imported patients stay in memory, so
+  they share one string object each.
+  """
+  return sys.intern(value) if value else value
+
 
-def parse_ccda(xml_content: str, source_file: Optional[str] = None) -> Tuple[ImportedPatient, List[str]]:
+def _fields(xpath: etree.XPath, elem) -> dict:
+  """Run a field-union XPath and index the matched nodes by tag."""
+  return {node.tag: node for node in xpath(elem)}
+
+
+def parse_ccda(
+  xml_content: Union[str, bytes, BinaryIO],
+  source_file: Optional[str] = None,
+) -> Tuple[ImportedPatient, List[str]]:
   """Parse C-CDA XML content into an ImportedPatient.
 
   Args:
-    xml_content: Raw XML string content
+    xml_content: Raw XML content, as text, UTF-8 bytes, or a binary file
+      positioned at the start (read in chunks, never loaded whole)
     source_file: Optional filename for reference
 
   Returns:
     Tuple of (ImportedPatient, list of parse warnings)
   """
+  if isinstance(xml_content, str):
+    xml_content = xml_content.encode("utf-8")
+  if isinstance(xml_content, bytes):
+    digest = hashlib.blake2b(xml_content, digest_size=16)
+    data = BytesIO(xml_content)
+  else:
+    digest = hashlib.blake2b(digest_size=16)
+    while chunk := xml_content.read(READ_CHUNK_SIZE):
+      digest.update(chunk)
+    xml_content.seek(0)
+    data = xml_content
+
+  # age_months depends on today's date, so entries only live for the day
+  key = (digest.digest(), date.today())
+  with _parse_cache_lock:
+    cached = _parse_cache.get(key)
+    if cached is not None:
+      _parse_cache.move_to_end(key)
+
+  if cached is None:
+    cached = _parse_document(data)
+    with _parse_cache_lock:
+      _parse_cache[key] = cached
+      while len(_parse_cache) > PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
+
+  # Each import is its own record: new id and timestamp, unshared lists
+  patient, warnings = cached
+  return patient.model_copy(update={
+    "id": str(uuid.uuid4()),
+    "imported_at": datetime.utcnow(),
+    "source_file": source_file,
+    "problems": list(patient.problems),
+    "medications": list(patient.medications),
+    "allergies": list(patient.allergies),
+    "encounters": list(patient.encounters),
+  }), list(warnings)
+
+
+def _parse_document(data: BinaryIO) -> Tuple[ImportedPatient, List[str]]:
+  """Parse encoded C-CDA XML; the cached, upload-independent part of parse_ccda."""
   warnings = []
 
+  # Extract clinical sections from structuredBody
+  sections = {"problems": [], "medications": [], "allergies": [], "encounters": []}
+
+  context = etree.iterparse(
+    data,
+    events=("start", "end"),
+    tag=(STRUCTURED_BODY_TAG, SECTION_TAG),
+    **_PARSE_OPTIONS,
+  )
   try:
-    # Register namespaces
-    for prefix, uri in NS.items():
-      if prefix:
-        ET.register_namespace(prefix, uri)
-      else:
-        ET.register_namespace("", uri)
-
-    root = ET.fromstring(xml_content)
-  except ET.ParseError as e:
+    for section in _iter_body_sections(context):
+      # Identify section by template ID or code
+      kind = _section_kind(XP_TEMPLATE_IDS(section), XP_SECTION_CODE(section))
+      if kind is not None:
+        sections[kind] = SECTION_EXTRACTORS[kind](section, warnings)
+  except etree.XMLSyntaxError as e:
     raise ValueError(f"Invalid XML: {e}")
 
-  # Helper to find elements with namespace
-  def find(elem, path):
-    # Prepend namespace to each element in path
-    ns_path = "/".join([f"{{{NS['']}}}{ p}" if p else p for p in path.split("/")])
-    return elem.find(ns_path)
-
-  def findall(elem, path):
-    ns_path = "/".join([f"{{{NS['']}}}{ p}" if p else p for p in path.split("/")])
-    return elem.findall(ns_path)
-
-  # Extract patient demographics
-  record_target = find(root, "recordTarget/patientRole")
-  patient_elem = find(record_target, "patient") if record_target is not None else None
+  # Extract patient demographics (the header is kept; only sections are freed)
+  patient_elem = _first(XP_PATIENT, context.root)
 
   name = _extract_name(patient_elem, warnings)
   birth_date = _extract_birth_date(patient_elem, warnings)
@@ -69,71 +252,69 @@ def parse_ccda(xml_content: str, source_file: Optional[str] = None) -> Tuple[Imp
     today = date.today()
     age_months = (today.year - birth_date.year) * 12 + (today.month - birth_date.month)
 
-  # Extract clinical sections
-  # Find structuredBody
-  structured_body = find(root, "component/structuredBody")
-
-  problems = []
-  medications = []
-  allergies = []
-  encounters = []
-
-  if structured_body is not None:
-    for component in findall(structured_body, "component"):
-      section = find(component, "section")
-      if section is None:
-        continue
-
-      # Identify section by template ID or code
-      template_ids = [t.get("root", "") for t in findall(section, "templateId")]
-      code_elem = find(section, "code")
-      section_code = code_elem.get("code", "") if code_elem is not None else ""
-
-      # Problems (2.16.840.1.113883.10.20.22.2.5 or LOINC 11450-4)
-      if "2.16.840.1.113883.10.20.22.2.5" in template_ids or section_code == "11450-4":
-        problems = _extract_problems(section, warnings)
-
-      # Medications (2.16.840.1.113883.10.20.22.2.1 or LOINC 10160-0)
-      elif "2.16.840.1.113883.10.20.22.2.1" in template_ids or section_code == "10160-0":
-        medications = _extract_medications(section, warnings)
-
-      # Allergies (2.16.840.1.113883.10.20.22.2.6 or LOINC 48765-2)
-      elif "2.16.840.1.113883.10.20.22.2.6" in template_ids or section_code == "48765-2":
-        allergies = _extract_allergies(section, warnings)
-
-      # Encounters (2.16.840.1.113883.10.20.22.2.22 or LOINC 46240-8)
-      elif "2.16.840.1.113883.10.20.22.2.22" in template_ids or section_code == "46240-8":
-        encounters = _extract_encounters(section, warnings)
-
   patient = ImportedPatient(
     name=name or "Unknown Patient",
     birth_date=birth_date,
     sex=sex,
     age_months=age_months,
-    problems=problems,
-    medications=medications,
-    allergies=allergies,
-    encounters=encounters,
+    **sections,
     source="ccda",
-    source_file=source_file,
   )
 
   return patient, warnings
 
 
+def _iter_body_sections(context: etree.iterparse) -> Iterator:
+  """Yield each top-level structuredBody section once fully parsed, then free it.
+
+  Only the first section of each component in the document's first
+  structuredBody is yielded; nested subsections stay attached to their parent
+  section until it is handled.
+  """
+  body = None
+  for event, elem in context:
+    if elem.tag == STRUCTURED_BODY_TAG:
+      if event == "start" and body is None and _is_root_component(elem.getparent()):
+        body = elem
+      continue
+
+    if event != "end" or body is None:
+      continue
+    component = elem.getparent()
+    if component is None or component.getparent() is not body or component.tag != COMPONENT_TAG:
+      continue
+    if component.find(SECTION_TAG) is not elem:
+      continue
+
+    yield elem
+
+    # Handled: drop this section's subtree and every component before it
+    elem.clear()
+    while component.getprevious() is not None:
+      del body[0]
+
+
+def _is_root_component(elem) -> bool:
+  """Whether elem is a component directly under the document root."""
+  if elem is None or elem.tag != COMPONENT_TAG:
+    return False
+  parent = elem.getparent()
+  return parent is not None and parent.getparent() is None
+
+
 def _extract_name(patient_elem, warnings: List[str]) -> Optional[str]:
   """Extract patient name from patient element."""
   if patient_elem is None:
     warnings.append("No patient element found")
     return None
 
-  name_elem = patient_elem.find(f"{{{NS['']}}}name")
+  name_elem = _first(XP_NAME, patient_elem)
   if name_elem is None:
     warnings.append("No name element found")
     return None
 
-  given = name_elem.find(f"{{{NS['']}}}given")
-  family = name_elem.find(f"{{{NS['']}}}family")
+  given = _first(XP_GIVEN, name_elem)
+  family = _first(XP_FAMILY, name_elem)
 
   parts = []
   if given is not None and given.text:
@@ -149,22 +330,19 @@ def _extract_birth_date(patient_elem, warnings: List[str]) -> Optional[date]:
   if patient_elem is None:
     return None
 
-  birth_time = patient_elem.find(f"{{{NS['']}}}birthTime")
+  birth_time = _first(XP_BIRTH_TIME, patient_elem)
   if birth_time is None:
     return None
 
+  # C-CDA uses YYYYMMDD format
   value = birth_time.get("value", "")
-  if not value:
+  if len(value) < 8:
     return None
 
-  try:
-    # C-CDA uses YYYYMMDD format
-    if len(value) >= 8:
-      return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
-  except (ValueError, IndexError):
+  birth_date = _parse_hl7_date(value)
+  if birth_date is None:
     warnings.append(f"Could not parse birth date: {value}")
-
-  return None
+  return birth_date
 
 
 def _extract_sex(patient_elem, warnings: List[str]) -> Optional[str]:
@@ -172,7 +350,7 @@ def _extract_sex(patient_elem, warnings: List[str]) -> Optional[str]:
   if patient_elem is None:
     return None
 
-  admin_gender = patient_elem.find(f"{{{NS['']}}}administrativeGenderCode")
+  admin_gender = _first(XP_ADMIN_GENDER, patient_elem)
   if admin_gender is None:
     return None
 
@@ -187,51 +365,35 @@ def _extract_sex(patient_elem, warnings: List[str]) -> Optional[str]:
   return display or None
 
 
-def _extract_problems(section, warnings: List[str]) -> List[Problem]:
+def _extract_problems(section, warnings: List[str]) -> List[dict]:
   """Extract problems from problem section."""
   problems = []
 
-  # Find all entries
-  for entry in section.findall(f".//{{{NS['']}}}entry"):
-    act = entry.find(f".//{{{NS['']}}}act")
-    if act is None:
-      continue
-
-    # Get observation within act
-    obs = act.find(f".//{{{NS['']}}}observation")
-    if obs is None:
-      continue
+  # Observation within each entry's act
+  for obs in XP_ENTRY_OBSERVATIONS(section):
+    fields = _fields(XP_PROBLEM_FIELDS, obs)
 
     # Get the code (problem)
-    value_elem = obs.find(f"{{{NS['']}}}value")
+    value_elem = fields.get(VALUE_TAG)
     if value_elem is None:
       continue
 
-    code = value_elem.get("code")
+    code = _intern(value_elem.get("code"))
     code_system = value_elem.get("codeSystem")
-    display = value_elem.get("displayName", "Unknown problem")
+    display = _intern(value_elem.get("displayName", "Unknown problem"))
 
     # Map code system OID to name
     code_system_name = _map_code_system(code_system)
 
     # Get status
-    status_code = obs.find(f".//{{{NS['']}}}statusCode")
-    status = status_code.get("code", "active") if status_code is not None else "active"
+    status_code = fields.get(STATUS_CODE_TAG)
+    status = _intern(status_code.get("code", "active")) if status_code is not None else "active"
 
     # Get onset date
-    onset_date = None
-    effective_time = obs.find(f"{{{NS['']}}}effectiveTime")
-    if effective_time is not None:
-      low = effective_time.find(f"{{{NS['']}}}low")
-      if low is not None:
-        value = low.get("value", "")
-        if len(value) >= 8:
-          try:
-            onset_date = date(int(value[:4]), int(value[4:6]), int(value[6:8]))
-          except (ValueError, IndexError):
-            pass
-
-    problems.append(Problem(
+    low = fields.get(LOW_TAG)
+    onset_date = _parse_hl7_date(low.get("value", "")) if low is not None else None
+
+    problems.append(dict(
       code=code,
       code_system=code_system_name,
       display=display,
@@ -242,38 +404,24 @@ def _extract_problems(section, warnings: List[str]) -> List[Problem]:
   return problems
 
 
-def _extract_medications(section, warnings: List[str]) -> List[Medication]:
+def _extract_medications(section, warnings: List[str]) -> List[dict]:
   """Extract medications from medication section."""
   medications = []
 
-  for entry in section.findall(f".//{{{NS['']}}}entry"):
-    subst_admin = entry.find(f".//{{{NS['']}}}substanceAdministration")
-    if subst_admin is None:
-      continue
-
-    # Get the drug
-    consumable = subst_admin.find(f".//{{{NS['']}}}consumable")
-    if consumable is None:
-      continue
+  for subst_admin in XP_ENTRY_SUBSTANCE_ADMINS(section):
+    fields = _fields(XP_MEDICATION_FIELDS, subst_admin)
 
-    manu_product = consumable.find(f".//{{{NS['']}}}manufacturedProduct")
-    if manu_product is None:
-      continue
-
-    material = manu_product.find(f".//{{{NS['']}}}manufacturedMaterial")
-    if material is None:
-      continue
-
-    code_elem = material.find(f"{{{NS['']}}}code")
+    # Get the drug (consumable/manufacturedProduct/manufacturedMaterial/code)
+    code_elem = fields.get(CODE_TAG)
     if code_elem is None:
       continue
 
-    code = code_elem.get("code")
+    code = _intern(code_elem.get("code"))
     code_system = _map_code_system(code_elem.get("codeSystem"))
-    display = code_elem.get("displayName", "Unknown medication")
+    display = _intern(code_elem.get("displayName", "Unknown medication"))
 
     # Get dose
-    dose_elem = subst_admin.find(f".//{{{NS['']}}}doseQuantity")
+    dose_elem = fields.get(DOSE_QUANTITY_TAG)
     dose = None
     if dose_elem is not None:
       dose_val = dose_elem.get("value", "")
@@ -282,14 +430,14 @@ def _extract_medications(section, warnings: List[str]) -> List[Medication]:
         dose = f"{dose_val} {dose_unit}".strip()
 
     # Get route
-    route_elem = subst_admin.find(f".//{{{NS['']}}}routeCode")
-    route = route_elem.get("displayName") if route_elem is not None else None
+    route_elem = fields.get(ROUTE_CODE_TAG)
+    route = _intern(route_elem.get("displayName")) if route_elem is not None else None
 
     # Get status
-    status_elem = subst_admin.find(f"{{{NS['']}}}statusCode")
-    status = status_elem.get("code", "active") if status_elem is not None else "active"
+    status_elem = fields.get(STATUS_CODE_TAG)
+    status = _intern(status_elem.get("code", "active")) if status_elem is not None else "active"
 
-    medications.append(Medication(
+    medications.append(dict(
       code=code,
       code_system=code_system,
       display=display,
@@ -301,57 +449,35 @@ def _extract_medications(section, warnings: List[str]) -> List[Medication]:
   return medications
 
 
-def _extract_allergies(section, warnings: List[str]) -> List[Allergy]:
+def _extract_allergies(section, warnings: List[str]) -> List[dict]:
   """Extract allergies from allergy section."""
   allergies = []
 
-  for entry in section.findall(f".//{{{NS['']}}}entry"):
-    act = entry.find(f".//{{{NS['']}}}act")
-    if act is None:
-      continue
-
-    obs = act.find(f".//{{{NS['']}}}observation")
-    if obs is None:
-      continue
+  for obs in XP_ENTRY_OBSERVATIONS(section):
+    fields = _fields(XP_ALLERGY_FIELDS, obs)
 
-    # Get allergen
-    participant = obs.find(f".//{{{NS['']}}}participant")
-    if participant is None:
-      continue
-
-    role = participant.find(f".//{{{NS['']}}}participantRole")
-    if role is None:
-      continue
-
-    entity = role.find(f".//{{{NS['']}}}playingEntity")
-    if entity is None:
-      continue
-
-    code_elem = entity.find(f"{{{NS['']}}}code")
+    # Get allergen (participant/participantRole/playingEntity/code)
+    code_elem = fields.get(CODE_TAG)
     if code_elem is None:
       continue
 
-    code = code_elem.get("code")
+    code = _intern(code_elem.get("code"))
     code_system = _map_code_system(code_elem.get("codeSystem"))
-    display = code_elem.get("displayName", "Unknown allergen")
+    display = _intern(code_elem.get("displayName", "Unknown allergen"))
 
     # Get reaction
     reaction = None
-    reaction_obs = obs.find(f".//{{{NS['']}}}entryRelationship/{{{NS['']}}}observation")
-    if reaction_obs is not None:
-      reaction_code = reaction_obs.find(f"{{{NS['']}}}value")
-      if reaction_code is not None:
-        reaction = reaction_code.get("displayName")
+    reaction_code = fields.get(VALUE_TAG)
+    if reaction_code is not None:
+      reaction = _intern(reaction_code.get("displayName"))
 
     # Get severity
     severity = None
-    severity_obs = obs.find(f".//{{{NS['']}}}entryRelationship[@typeCode='SUBJ']/{{{NS['']}}}observation")
-    if severity_obs is not None:
-      severity_code = severity_obs.find(f"{{{NS['']}}}value")
-      if severity_code is not None:
-        severity = severity_code.get("displayName")
+    severity_code = _first(XP_SEVERITY_VALUE, obs)
+    if severity_code is not None:
+      severity = _intern(severity_code.get("displayName"))
 
-    allergies.append(Allergy(
+    allergies.append(dict(
       code=code,
       code_system=code_system,
       display=display,
@@ -362,41 +488,28 @@ def _extract_allergies(section, warnings: List[str]) -> List[Allergy]:
   return allergies
 
 
-def _extract_encounters(section, warnings: List[str]) -> List[Encounter]:
+def _extract_encounters(section, warnings: List[str]) -> List[dict]:
   """Extract encounters from encounters section."""
   encounters = []
 
-  for entry in section.findall(f".//{{{NS['']}}}entry"):
-    enc = entry.find(f".//{{{NS['']}}}encounter")
-    if enc is None:
-      continue
+  for enc in XP_ENTRY_ENCOUNTERS(section):
+    fields = _fields(XP_ENCOUNTER_FIELDS, enc)
 
     # Get encounter date
-    enc_date = None
-    effective_time = enc.find(f"{{{NS['']}}}effectiveTime")
-    if effective_time is not None:
-      value = effective_time.get("value", "")
-      if len(value) >= 8:
-        try:
-          enc_date = date(int(value[:4]), int(value[4:6]), int(value[6:8]))
-        except (ValueError, IndexError):
-          pass
+    effective_time = fields.get(EFFECTIVE_TIME_TAG)
+    enc_date = _parse_hl7_date(effective_time.get("value", "")) if effective_time is not None else None
 
     # Get encounter type
-    code_elem = enc.find(f"{{{NS['']}}}code")
-    enc_type = code_elem.get("displayName") if code_elem is not None else None
+    code_elem = fields.get(CODE_TAG)
+    enc_type = _intern(code_elem.get("displayName")) if code_elem is not None else None
 
     # Get reason
     reason = None
-    entry_rel = enc.find(f".//{{{NS['']}}}entryRelationship")
-    if entry_rel is not None:
-      obs = entry_rel.find(f".//{{{NS['']}}}observation")
-      if obs is not None:
-        value_elem = obs.find(f"{{{NS['']}}}value")
-        if value_elem is not None:
-          reason = value_elem.get("displayName")
-
-    encounters.append(Encounter(
+    value_elem = fields.get(VALUE_TAG)
+    if value_elem is not None:
+      reason = _intern(value_elem.get("displayName"))
+
+    encounters.append(dict(
       date=enc_date,
       type=enc_type,
       reason=reason,
@@ -405,17 +518,45 @@ def _extract_encounters(section, warnings: List[str]) -> List[Encounter]:
   return encounters
 
 
+# Checked in this order when a section matches more than one kind
+SECTION_EXTRACTORS = {
+  "problems": _extract_problems,
+  "medications": _extract_medications,
+  "allergies": _extract_allergies,
+  "encounters": _extract_encounters,
+}
+_SECTION_RANK = {kind: rank for rank, kind in enumerate(SECTION_EXTRACTORS)}
+
+
+def _section_kind(template_ids: List[str], section_code: str) -> Optional[str]:
+  """Which clinical list a section fills, from its template IDs or LOINC code."""
+  kinds = [SECTION_KEYS[key] for key in (*template_ids, section_code) if key in SECTION_KEYS]
+  if len(kinds) > 1:
+    return min(kinds, key=_SECTION_RANK.__getitem__)
+  return kinds[0] if kinds else None
+
+
+def _parse_hl7_date(value: str) -> Optional[date]:
+  """Parse the YYYYMMDD start of an HL7 timestamp; None if it isn't a valid date."""
+  head = value[:8]
+  if len(head) < 8 or not head.isascii() or not head.isdigit():
+    return None
+  o = ord
+  year = (o(head[0]) - 48) * 1000 + (o(head[1]) - 48) * 100 + (o(head[2]) - 48) * 10 + o(head[3]) - 48
+  month = (o(head[4]) - 48) * 10 + o(head[5]) - 48
+  day = (o(head[6]) - 48) * 10 + o(head[7]) - 48
+  # Reject out-of-range parts without raising; only e.g. Feb 30 reaches except
+  if not (0 < month < 13 and 0 < day < 32 and year):
+    return None
+  try:
+    return date(year, month, day)
+  except ValueError:
+    return None
+
+
+@lru_cache(maxsize=64)
 def _map_code_system(oid: Optional[str]) -> Optional[str]:
   """Map OID to human-readable code system name."""
   if not oid:
     return None
-
-  oid_map = {
-    "2.16.840.1.113883.6.96": "SNOMED-CT",
-    "2.16.840.1.113883.6.90": "ICD-10-CM",
-    "2.16.840.1.113883.6.88": "RxNorm",
-    "2.16.840.1.113883.6.1": "LOINC",
-    "2.16.840.1.113883.6.69": "NDC",
-  }
-
-  return oid_map.get(oid, oid)
+  return CODE_SYSTEM_NAMES.get(oid, oid)
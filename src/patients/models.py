@@ -1,14 +1,18 @@
 """Models for imported patients."""
 
+from dataclasses import dataclass
 from datetime import datetime, date
 from typing import Optional, List
 from uuid import UUID
 import uuid
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
-class Problem(BaseModel):
+# Child records are slotted dataclasses: C-CDA imports create thousands of
+# them, and pydantic still validates them as ImportedPatient fields
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Problem:
   """A problem/condition from the patient's problem list."""
   code: Optional[str] = None  # SNOMED or ICD-10
   code_system: Optional[str] = None
@@ -17,7 +21,8 @@ class Problem(BaseModel):
   status: str = "active"
 
 
-class Medication(BaseModel):
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Medication:
   """A medication from the patient's medication list."""
   code: Optional[str] = None  # RxNorm
   code_system: Optional[str] = None
@@ -28,7 +33,8 @@ class Medication(BaseModel):
   status: str = "active"
 
 
-class Allergy(BaseModel):
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Allergy:
   """An allergy from the patient's allergy list."""
   code: Optional[str] = None
   code_system: Optional[str] = None
@@ -37,9 +43,14 @@ class Allergy(BaseModel):
   severity: Optional[str] = None
 
 
-class Encounter(BaseModel):
+# Encounter has a field named "date", which shadows the type in its class body
+_Date = date
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Encounter:
   """A past encounter from the patient's history."""
-  date: Optional[date] = None
+  date: Optional[_Date] = None
   type: Optional[str] = None
   reason: Optional[str] = None
   provider: Optional[str] = None
@@ -67,6 +78,9 @@ class ImportedPatient(BaseModel):
   source_file: Optional[str] = None
   imported_at: datetime = Field(default_factory=datetime.utcnow)
 
+  # Case-generation context built from this patient, reused across cases
+  _case_context: Optional[dict] = PrivateAttr(default=None)
+
 
 class PatientListResponse(BaseModel):
   """Response for listing imported patients."""
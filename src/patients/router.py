@@ -1,13 +1,17 @@
 """Patient import router for Echo."""
 
+import asyncio
+import codecs
+from itertools import islice
 from typing import Optional, List
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, UploadFile, File, status
 from pydantic import BaseModel
 
 from ..auth.deps import get_current_user, get_optional_user
 from ..auth.models import User
+from ..core.responses import OrjsonResponse
 from ..database import get_db, is_database_configured
 
 from .models import (
@@ -22,18 +26,67 @@ from .ccda_parser import parse_ccda
 
 router = APIRouter(prefix="/patients", tags=["patients"])
 
+# Cap on C-CDA files parsed at once during a bulk upload
+MAX_CONCURRENT_PARSES = 8
 
-# In-memory storage for patients when DB not configured
-_memory_patients: dict[str, List[ImportedPatient]] = {}
+# Upload size limits: per C-CDA file, and across one bulk upload
+MAX_CCDA_BYTES = 25 * 1024 * 1024
+MAX_BULK_BYTES = 250 * 1024 * 1024
+UPLOAD_READ_CHUNK = 1 << 20
+TOO_LARGE_DETAIL = "File exceeds 25MB limit"
 
+# Accepted C-CDA file extensions, matched case-insensitively
+_ALLOWED_EXT = (".xml", ".cda", ".ccda")
 
-def _get_user_patients(user_id: str) -> List[ImportedPatient]:
-  """Get in-memory patients for a user."""
+
+# In-memory storage for patients when DB not configured:
+# user_id -> {patient_id: patient}, in import order
+_memory_patients: dict[str, dict[str, ImportedPatient]] = {}
+
+
+# user_id -> count of changes to that user's panel, for list ETags. The
+# epoch keeps ETags from before a restart from matching the new store.
+_patient_versions: dict[str, int] = {}
+_ETAG_EPOCH = uuid4().hex[:8]
+
+
+def _get_user_patients(user_id: str) -> dict[str, ImportedPatient]:
+  """Get a user's in-memory patients, keyed by patient id."""
   if user_id not in _memory_patients:
-    _memory_patients[user_id] = []
+    _memory_patients[user_id] = {}
   return _memory_patients[user_id]
 
 
+def _bump_patient_version(user_id: str) -> None:
+  """Record a change to a user's panel, invalidating their list ETag."""
+  _patient_versions[user_id] = _patient_versions.get(user_id, 0) + 1
+
+
+async def _check_upload(file: UploadFile) -> None:
+  """Check an upload's size and encoding without holding it in memory.
+
+  The declared size is checked first; the file is then read in chunks, so a
+  missing or wrong size still stops at the cap. Rewinds the file for parsing.
+  """
+  if file.size is not None and file.size > MAX_CCDA_BYTES:
+    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+
+  decoder = codecs.getincrementaldecoder("utf-8")()
+  total = 0
+  try:
+    while chunk := await file.read(UPLOAD_READ_CHUNK):
+      total += len(chunk)
+      if total > MAX_CCDA_BYTES:
+        raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+      # ASCII is valid UTF-8; only decode chunks that could be invalid
+      if not chunk.isascii() or decoder.getstate()[0]:
+        decoder.decode(chunk)
+    decoder.decode(b"", final=True)
+  except UnicodeDecodeError:
+    raise HTTPException(status_code=400, detail="File must be valid UTF-8 encoded XML")
+  await file.seek(0)
+
+
 @router.post("/import", response_model=PatientImportResponse)
 async def import_patient(
   file: UploadFile = File(...),
@@ -52,37 +105,74 @@ async def import_patient(
   if not file.filename:
     raise HTTPException(status_code=400, detail="No filename provided")
 
-  if not file.filename.endswith((".xml", ".cda", ".ccda")):
+  if not file.filename.lower().endswith(_ALLOWED_EXT):
     raise HTTPException(
       status_code=400,
       detail="File must be XML format (.xml, .cda, or .ccda)",
     )
 
-  # Read file content
-  try:
-    content = await file.read()
-    xml_content = content.decode("utf-8")
-  except UnicodeDecodeError:
-    raise HTTPException(status_code=400, detail="File must be valid UTF-8 encoded XML")
+  # The parser reads the spooled upload directly; it is never buffered whole
+  await _check_upload(file)
 
-  # Parse C-CDA
+  # Parse C-CDA off the event loop; large uploads are spooled to disk
   try:
-    patient, warnings = parse_ccda(xml_content, source_file=file.filename)
+    patient, warnings = await asyncio.to_thread(parse_ccda, file.file, source_file=file.filename)
   except ValueError as e:
     raise HTTPException(status_code=400, detail=str(e))
 
   # Set user ID
-  patient.user_id = str(user.id)
+  user_id = str(user.id)
+  patient.user_id = user_id
 
   # Store patient
   # For now, use in-memory storage
   # TODO: Add database persistence
-  patients = _get_user_patients(str(user.id))
-  patients.append(patient)
+  patients = _get_user_patients(user_id)
+  patients[patient.id] = patient
+  _bump_patient_version(user_id)
 
-  return PatientImportResponse(
+  return OrjsonResponse(PatientImportResponse(
     patient=patient,
     parse_warnings=warnings,
+  ))
+
+
+async def _import_one(file: UploadFile, semaphore: asyncio.Semaphore) -> BulkImportResult:
+  """Read and parse one file of a bulk upload; failures become error results."""
+  filename = file.filename or "unknown"
+
+  if not filename.lower().endswith(_ALLOWED_EXT):
+    return BulkImportResult(
+      filename=filename,
+      success=False,
+      error="File must be XML format (.xml, .cda, or .ccda)",
+    )
+
+  try:
+    await _check_upload(file)
+  except HTTPException as e:
+    return BulkImportResult(
+      filename=filename,
+      success=False,
+      error=e.detail,
+    )
+
+  # Parsing is CPU-bound; keep it off the event loop
+  try:
+    async with semaphore:
+      patient, warnings = await asyncio.to_thread(parse_ccda, file.file, source_file=filename)
+  except ValueError as e:
+    return BulkImportResult(
+      filename=filename,
+      success=False,
+      error=str(e),
+    )
+
+  return BulkImportResult(
+    filename=filename,
+    success=True,
+    patient=patient,
+    warnings=warnings,
   )
 
 
@@ -101,69 +191,60 @@ async def bulk_import_patients(
       detail="Maximum 50 files allowed per upload",
     )
 
-  results: List[BulkImportResult] = []
-  patients = _get_user_patients(str(user.id))
-
-  for file in files:
-    filename = file.filename or "unknown"
-    
-    if not filename.endswith((".xml", ".cda", ".ccda")):
-      results.append(BulkImportResult(
-        filename=filename,
-        success=False,
-        error="File must be XML format (.xml, .cda, or .ccda)",
-      ))
-      continue
-
-    try:
-      content = await file.read()
-      xml_content = content.decode("utf-8")
-    except UnicodeDecodeError:
-      results.append(BulkImportResult(
-        filename=filename,
-        success=False,
-        error="File must be valid UTF-8 encoded XML",
-      ))
-      continue
-
-    try:
-      patient, warnings = parse_ccda(xml_content, source_file=filename)
-      patient.user_id = str(user.id)
-      patients.append(patient)
-      
-      results.append(BulkImportResult(
-        filename=filename,
-        success=True,
-        patient=patient,
-        warnings=warnings,
-      ))
-    except ValueError as e:
-      results.append(BulkImportResult(
-        filename=filename,
-        success=False,
-        error=str(e),
-      ))
+  if sum(f.size or 0 for f in files) > MAX_BULK_BYTES:
+    raise HTTPException(
+      status_code=413,
+      detail="Upload exceeds 250MB limit",
+    )
+
+  # Files are read and parsed concurrently; results keep upload order
+  semaphore = asyncio.Semaphore(MAX_CONCURRENT_PARSES)
+  results: List[BulkImportResult] = await asyncio.gather(
+    *(_import_one(file, semaphore) for file in files)
+  )
+
+  user_id = str(user.id)
+  patients = _get_user_patients(user_id)
+  for result in results:
+    if result.success:
+      result.patient.user_id = user_id
+      patients[result.patient.id] = result.patient
+  if any(r.success for r in results):
+    _bump_patient_version(user_id)
 
   successful = sum(1 for r in results if r.success)
   
-  return BulkImportResponse(
+  return OrjsonResponse(BulkImportResponse(
     results=results,
     total_files=len(files),
     successful=successful,
     failed=len(files) - successful,
-  )
+  ))
 
 
 @router.get("", response_model=PatientListResponse)
 async def list_patients(
+  request: Request,
   user: User = Depends(get_current_user),
 ):
-  """List all imported patients for the current user."""
-  patients = _get_user_patients(str(user.id))
+  """List all imported patients for the current user.
 
-  return PatientListResponse(
-    patients=patients,
-    total_count=len(patients),
+  Sends an ETag that changes on import or delete; a matching
+  If-None-Match gets a 304 without re-serializing the panel.
+  """
+  user_id = str(user.id)
+  etag = f'W/"{_ETAG_EPOCH}:{user_id}:{_patient_versions.get(user_id, 0)}"'
+  if request.headers.get("if-none-match") == etag:
+    return Response(status_code=304, headers={"ETag": etag})
+
+  patients = list(_get_user_patients(user_id).values())
+
+  return OrjsonResponse(
+    PatientListResponse(
+      patients=patients,
+      total_count=len(patients),
+    ),
+    headers={"ETag": etag},
   )
 
 
@@ -173,11 +254,9 @@ async def get_patient(
   user: User = Depends(get_current_user),
 ):
   """Get a specific imported patient."""
-  patients = _get_user_patients(str(user.id))
-
-  for patient in patients:
-    if patient.id == patient_id:
-      return patient
+  patient = _get_user_patients(str(user.id)).get(patient_id)
+  if patient is not None:
+    return OrjsonResponse(patient)
 
   raise HTTPException(status_code=404, detail="Patient not found")
 
@@ -188,12 +267,10 @@ async def delete_patient(
   user: User = Depends(get_current_user),
 ):
   """Delete an imported patient from the user's panel."""
-  patients = _get_user_patients(str(user.id))
-
-  for i, patient in enumerate(patients):
-    if patient.id == patient_id:
-      patients.pop(i)
-      return {"message": "Patient deleted", "patient_id": patient_id}
+  user_id = str(user.id)
+  if _get_user_patients(user_id).pop(patient_id, None) is not None:
+    _bump_patient_version(user_id)
+    return {"message": "Patient deleted", "patient_id": patient_id}
 
   raise HTTPException(status_code=404, detail="Patient not found")
 
@@ -213,32 +290,37 @@ def get_patient_context_for_case(
   """Get patient context suitable for case generation.
 
   Returns dict with patient data that can be incorporated into
-  the case generation prompt.
+  the case generation prompt. Built once per imported patient and
+  shared between calls, so treat it as read-only.
   """
-  patients = _get_user_patients(user_id)
-
-  for patient in patients:
-    if patient.id == patient_id:
-      return {
-        "name": patient.name,
-        "age_months": patient.age_months,
-        "sex": patient.sex,
-        "problems": [
-          {"display": p.display, "code": p.code, "status": p.status}
-          for p in patient.problems if p.status == "active"
-        ],
-        "medications": [
-          {"display": m.display, "dose": m.dose}
-          for m in patient.medications if m.status == "active"
-        ],
-        "allergies": [
-          {"display": a.display, "reaction": a.reaction, "severity": a.severity}
-          for a in patient.allergies
-        ],
-        "recent_encounters": [
-          {"date": str(e.date) if e.date else None, "type": e.type, "reason": e.reason}
-          for e in patient.encounters[:5]  # Last 5 encounters
-        ],
-      }
-
-  return None
+  patient = _get_user_patients(user_id).get(patient_id)
+  if patient is None:
+    return None
+  if patient._case_context is None:
+    patient._case_context = _build_case_context(patient)
+  return patient._case_context
+
+
+def _build_case_context(patient: ImportedPatient) -> dict:
+  """Case-generation view of a patient: active problems and meds, recent visits."""
+  return {
+    "name": patient.name,
+    "age_months": patient.age_months,
+    "sex": patient.sex,
+    "problems": [
+      {"display": p.display, "code": p.code, "status": p.status}
+      for p in patient.problems if p.status == "active"
+    ],
+    "medications": [
+      {"display": m.display, "dose": m.dose}
+      for m in patient.medications if m.status == "active"
+    ],
+    "allergies": [
+      {"display": a.display, "reaction": a.reaction, "severity": a.severity}
+      for a in patient.allergies
+    ],
+    "recent_encounters": [
+      {"date": str(e.date) if e.date else None, "type": e.type, "reason": e.reason}
+      for e in islice(patient.encounters, 5)  # Last 5 encounters
+    ],
+  }
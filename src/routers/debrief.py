@@ -2,6 +2,7 @@
 
 from fastapi import APIRouter, Depends
 from ..models.feedback import DebriefRequest, DebriefResponse
+from ..core.responses import OrjsonResponse
 from ..core.tutor import Tutor, get_tutor
 
 router = APIRouter()
@@ -11,7 +12,7 @@ router = APIRouter()
 async def get_debrief(
   request: DebriefRequest,
   tutor: Tutor = Depends(get_tutor),
-) -> DebriefResponse:
+) -> OrjsonResponse:
   """
   Get Echo's post-encounter debrief.
 
@@ -20,4 +21,4 @@ async def get_debrief(
   - Learner wants comprehensive feedback
   - Reviewing a case for learning
   """
-  return await tutor.debrief_encounter(request)
+  return OrjsonResponse(await tutor.debrief_encounter(request))
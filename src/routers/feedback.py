@@ -2,6 +2,7 @@
 
 from fastapi import APIRouter, Depends
 from ..models import FeedbackRequest, FeedbackResponse
+from ..core.responses import OrjsonResponse
 from ..core.tutor import Tutor, get_tutor
 
 router = APIRouter()
@@ -11,7 +12,7 @@ router = APIRouter()
 async def get_feedback(
   request: FeedbackRequest,
   tutor: Tutor = Depends(get_tutor),
-) -> FeedbackResponse:
+) -> OrjsonResponse:
   """
   Get Echo's feedback on a learner action.
 
@@ -20,4 +21,4 @@ async def get_feedback(
   - Learner asks a question during an encounter
   - Learner documents something in the chart
   """
-  return await tutor.provide_feedback(request)
+  return OrjsonResponse(await tutor.provide_feedback(request))
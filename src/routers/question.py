@@ -2,6 +2,7 @@
 
 from fastapi import APIRouter, Depends
 from ..models.feedback import QuestionRequest, QuestionResponse
+from ..core.responses import OrjsonResponse
 from ..core.tutor import Tutor, get_tutor
 
 router = APIRouter()
@@ -11,7 +12,7 @@ router = APIRouter()
 async def get_question(
   request: QuestionRequest,
   tutor: Tutor = Depends(get_tutor),
-) -> QuestionResponse:
+) -> OrjsonResponse:
   """
   Get a Socratic question from Echo.
 
@@ -20,4 +21,4 @@ async def get_question(
   - You want to prompt reflection on a case
   - Teaching moment during chart review
   """
-  return await tutor.ask_socratic_question(request)
+  return OrjsonResponse(await tutor.ask_socratic_question(request))
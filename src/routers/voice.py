@@ -1,21 +1,75 @@
 """Voice endpoints - TTS for Echo responses and real-time conversation."""
 
-import json
-import base64
-from typing import Optional
+import hashlib
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 
 from ..core.voice_out import VoiceOut, get_voice_out
-from ..core.tutor import get_tutor
+from ..core.tutor import Tutor, get_tutor
 from ..models.feedback import QuestionRequest
 from ..config import ECHO_VOICES, DEFAULT_VOICE
 
 
 router = APIRouter()
 
+# Bounds for the synthesized-audio cache
+TTS_CACHE_MAX_ENTRIES = 256
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class TTSCache:
+  """LRU cache of synthesized MP3s keyed by (voice ID, text hash).
+
+  Echo's questions and stock prompts recur, and synthesis is deterministic
+  for a voice and text, so a hit skips the Eleven Labs round-trip.
+  """
+
+  def __init__(self, max_entries: int = TTS_CACHE_MAX_ENTRIES, max_bytes: int = TTS_CACHE_MAX_BYTES):
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.total_bytes = 0
+    self._entries: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+
+  @staticmethod
+  def key(voice_id: str, text: str) -> tuple[str, bytes]:
+    return voice_id, hashlib.sha1(text.encode("utf-8")).digest()
+
+  def get(self, key: tuple[str, bytes]) -> Optional[bytes]:
+    audio = self._entries.get(key)
+    if audio is not None:
+      self._entries.move_to_end(key)
+    return audio
+
+  def put(self, key: tuple[str, bytes], audio: bytes) -> None:
+    if not audio or len(audio) > self.max_bytes:
+      return
+    old = self._entries.pop(key, None)
+    if old is not None:
+      self.total_bytes -= len(old)
+    self._entries[key] = audio
+    self.total_bytes += len(audio)
+    while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+      _, evicted = self._entries.popitem(last=False)
+      self.total_bytes -= len(evicted)
+
+
+_tts_cache = TTSCache()
+
+
+async def _synthesize_cached(voice_out: VoiceOut, text: str, voice: Optional[str]) -> bytes:
+  """Full MP3 for text, from the cache when this voice has said it before."""
+  key = TTSCache.key(voice_out._resolve_voice_id(voice), text)
+  audio = _tts_cache.get(key)
+  if audio is None:
+    audio = await voice_out.synthesize(text=text, voice=voice)
+    _tts_cache.put(key, audio)
+  return audio
+
 
 class SpeakRequest(BaseModel):
   """Request to synthesize speech."""
@@ -33,12 +87,15 @@ class VoiceInfo(BaseModel):
 @router.post("/speak")
 async def speak(
   request: SpeakRequest,
+  buffered: bool = False,
   voice_out: VoiceOut = Depends(get_voice_out),
 ):
   """
   Convert text to speech and return audio.
 
-  Returns MP3 audio bytes. Use voice parameter to select a voice:
+  Returns MP3 audio, streamed as it is synthesized. Pass ?buffered=true
+  to get the whole file with a Content-Length instead. Use voice
+  parameter to select a voice:
   - eryn (default), matilda, clarice, clara, devan, lilly
 
   Example:
@@ -48,23 +105,45 @@ async def speak(
   if not request.text.strip():
     raise HTTPException(status_code=400, detail="Text cannot be empty")
 
+  headers = {"Content-Disposition": "inline; filename=echo_speech.mp3"}
+  key = TTSCache.key(voice_out._resolve_voice_id(request.voice), request.text)
   try:
-    audio_bytes = await voice_out.synthesize(
+    audio_bytes = _tts_cache.get(key)
+    if buffered and audio_bytes is None:
+      audio_bytes = await _synthesize_cached(voice_out, request.text, request.voice)
+    if audio_bytes is not None:
+      return Response(audio_bytes, media_type="audio/mpeg", headers=headers)
+
+    chunks = voice_out.stream(
       text=request.text,
       voice=request.voice,
     )
-
-    return StreamingResponse(
-      iter([audio_bytes]),
-      media_type="audio/mpeg",
-      headers={
-        "Content-Disposition": "inline; filename=echo_speech.mp3",
-        "Content-Length": str(len(audio_bytes)),
-      },
-    )
+    # Wait for the first chunk so provider errors still surface as a 500
+    first = await anext(chunks, b"")
   except Exception as e:
     raise HTTPException(status_code=500, detail=f"TTS synthesis failed: {str(e)}")
 
+  return StreamingResponse(
+    _stream_and_cache(key, first, chunks),
+    media_type="audio/mpeg",
+    headers=headers,
+  )
+
+
+async def _stream_and_cache(
+  key: tuple[str, bytes],
+  first: bytes,
+  rest: AsyncIterator[bytes],
+) -> AsyncIterator[bytes]:
+  """Yield an already-received first chunk, then the rest; cache the clip once complete."""
+  chunks = [first] if first else []
+  if first:
+    yield first
+  async for chunk in rest:
+    chunks.append(chunk)
+    yield chunk
+  _tts_cache.put(key, b"".join(chunks))
+
 
 @router.post("/speak/stream")
 async def speak_stream(
@@ -79,41 +158,69 @@ async def speak_stream(
   if not request.text.strip():
     raise HTTPException(status_code=400, detail="Text cannot be empty")
 
-  async def audio_generator():
-    try:
-      async for chunk in voice_out.stream(
-        text=request.text,
-        voice=request.voice,
-      ):
-        yield chunk
-    except Exception as e:
-      raise HTTPException(status_code=500, detail=f"TTS stream failed: {str(e)}")
+  chunks = voice_out.stream(
+    text=request.text,
+    voice=request.voice,
+  )
+  # Errors can only become a 500 before headers are sent, so await the
+  # first chunk here; later chunks pass through without a wrapper
+  try:
+    first = await anext(chunks, b"")
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f"TTS stream failed: {str(e)}")
 
   return StreamingResponse(
-    audio_generator(),
+    _prepend(first, chunks),
     media_type="audio/mpeg",
   )
 
 
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+  """Yield an already-received first chunk, then the rest of the stream."""
+  if first:
+    yield first
+  async for chunk in rest:
+    yield chunk
+
+
+# The voice list is fixed by config, so build and serialize it once
+_VOICES = [
+  VoiceInfo(
+    name=name.capitalize(),
+    voice_id=voice_id,
+    is_default=(name == DEFAULT_VOICE),
+  )
+  for name, voice_id in ECHO_VOICES.items()
+]
+_VOICES_JSON = TypeAdapter(list[VoiceInfo]).dump_json(_VOICES)
+_VOICES_ETAG = f'"{hashlib.sha1(_VOICES_JSON).hexdigest()[:16]}"'
+
+
 @router.get("/voices", response_model=list[VoiceInfo])
-async def list_voices():
+async def list_voices(request: Request):
   """
   List available Echo voices.
 
   Returns all configured voices with their IDs and default status.
+  Clients re-polling with If-None-Match get a 304.
   """
-  voices = []
-  for name, voice_id in ECHO_VOICES.items():
-    voices.append(VoiceInfo(
-      name=name.capitalize(),
-      voice_id=voice_id,
-      is_default=(name == DEFAULT_VOICE),
-    ))
-  return voices
+  headers = {"ETag": _VOICES_ETAG}
+  if request.headers.get("if-none-match") == _VOICES_ETAG:
+    return Response(status_code=304, headers=headers)
+  return Response(content=_VOICES_JSON, media_type="application/json", headers=headers)
+
+
+async def _send_json(websocket: WebSocket, payload: dict) -> None:
+  """Send a JSON text frame, serialized with orjson rather than stdlib json."""
+  await websocket.send_text(orjson.dumps(payload).decode())
 
 
 @router.websocket("/conversation")
-async def conversation_websocket(websocket: WebSocket):
+async def conversation_websocket(
+  websocket: WebSocket,
+  tutor: Tutor = Depends(get_tutor),
+  voice_out: VoiceOut = Depends(get_voice_out),
+):
   """
   Real-time conversation WebSocket endpoint.
 
@@ -132,34 +239,34 @@ async def conversation_websocket(websocket: WebSocket):
     "text": "Echo's response",
     "topic": "clinical concept",
     "hint": "optional hint",
-    "audio": "base64-encoded-mp3"  // if include_audio was true
+    "has_audio": true             // if include_audio was true
   }
+
+  When has_audio is true, the response is followed by one binary frame
+  holding the MP3 audio.
   """
   await websocket.accept()
 
-  tutor = get_tutor()
-  voice_out = get_voice_out()
-
   try:
     while True:
       # Receive message from client
       data = await websocket.receive_text()
 
       try:
-        message = json.loads(data)
-      except json.JSONDecodeError:
-        await websocket.send_json({
+        message = orjson.loads(data)
+      except orjson.JSONDecodeError:
+        await _send_json(websocket, {
           "type": "error",
           "message": "Invalid JSON format",
         })
         continue
 
       if message.get("type") == "ping":
-        await websocket.send_json({"type": "pong"})
+        await _send_json(websocket, {"type": "pong"})
         continue
 
       if message.get("type") != "message":
-        await websocket.send_json({
+        await _send_json(websocket, {
           "type": "error",
           "message": f"Unknown message type: {message.get('type')}",
         })
@@ -167,7 +274,7 @@ async def conversation_websocket(websocket: WebSocket):
 
       text = message.get("text", "").strip()
       if not text:
-        await websocket.send_json({
+        await _send_json(websocket, {
           "type": "error",
           "message": "Message text cannot be empty",
         })
@@ -188,19 +295,19 @@ async def conversation_websocket(websocket: WebSocket):
           "hint": response.hint,
         }
 
-        # Include TTS audio if requested
+        # Include TTS audio if requested, as a binary frame after the text
+        audio_bytes = None
         if message.get("include_audio", False):
           voice = message.get("voice", DEFAULT_VOICE)
-          audio_bytes = await voice_out.synthesize(
-            text=response.question,
-            voice=voice,
-          )
-          result["audio"] = base64.b64encode(audio_bytes).decode("utf-8")
+          audio_bytes = await _synthesize_cached(voice_out, response.question, voice)
+          result["has_audio"] = True
 
-        await websocket.send_json(result)
+        await _send_json(websocket, result)
+        if audio_bytes is not None:
+          await websocket.send_bytes(audio_bytes)
 
       except Exception as e:
-        await websocket.send_json({
+        await _send_json(websocket, {
           "type": "error",
           "message": f"Tutor error: {str(e)}",
         })
@@ -0,0 +1,207 @@
+"""Test C-CDA patient import parsing."""
+
+from datetime import date
+from io import BytesIO
+
+import pytest
+from lxml import etree
+
+from src.patients import ccda_parser
+from src.patients.ccda_parser import parse_ccda
+
+
+SAMPLE_CCDA = """<?xml version="1.0" encoding="UTF-8"?>
+<ClinicalDocument xmlns="urn:hl7-org:v3">
+  <recordTarget>
+    <patientRole>
+      <patient>
+        <name><given>Ava</given><family>Reyes</family></name>
+        <administrativeGenderCode code="F"/>
+        <birthTime value="20180405"/>
+      </patient>
+    </patientRole>
+  </recordTarget>
+  <component>
+    <structuredBody>
+      <component>
+        <section>
+          <templateId root="2.16.840.1.113883.10.20.22.2.5.1"/>
+          <code code="11450-4"/>
+          <entry>
+            <act>
+              <entryRelationship>
+                <observation>
+                  <statusCode code="completed"/>
+                  <effectiveTime><low value="20200301"/></effectiveTime>
+                  <value code="195967001" codeSystem="2.16.840.1.113883.6.96" displayName="Asthma"/>
+                </observation>
+              </entryRelationship>
+            </act>
+          </entry>
+        </section>
+      </component>
+      <component>
+        <section>
+          <templateId root="2.16.840.1.113883.10.20.22.2.1"/>
+          <entry>
+            <substanceAdministration>
+              <routeCode displayName="Oral"/>
+              <doseQuantity value="5" unit="mL"/>
+              <consumable>
+                <manufacturedProduct>
+                  <manufacturedMaterial>
+                    <code code="723" codeSystem="2.16.840.1.113883.6.88" displayName="Amoxicillin"/>
+                  </manufacturedMaterial>
+                </manufacturedProduct>
+              </consumable>
+            </substanceAdministration>
+          </entry>
+        </section>
+      </component>
+      <component>
+        <section>
+          <code code="48765-2"/>
+          <entry>
+            <act>
+              <entryRelationship>
+                <observation>
+                  <participant>
+                    <participantRole>
+                      <playingEntity>
+                        <code code="7980" codeSystem="2.16.840.1.113883.6.88" displayName="Penicillin"/>
+                      </playingEntity>
+                    </participantRole>
+                  </participant>
+                  <entryRelationship typeCode="MFST">
+                    <observation><value displayName="Hives"/></observation>
+                  </entryRelationship>
+                  <entryRelationship typeCode="SUBJ">
+                    <observation><value displayName="Moderate"/></observation>
+                  </entryRelationship>
+                </observation>
+              </entryRelationship>
+            </act>
+          </entry>
+        </section>
+      </component>
+      <component>
+        <section>
+          <templateId root="2.16.840.1.113883.10.20.22.2.22"/>
+          <entry>
+            <encounter>
+              <effectiveTime value="20230115"/>
+              <code displayName="Office visit"/>
+              <entryRelationship>
+                <observation><value displayName="Fever"/></observation>
+              </entryRelationship>
+            </encounter>
+          </entry>
+        </section>
+      </component>
+    </structuredBody>
+  </component>
+</ClinicalDocument>
+"""
+
+
+def test_parse_ccda_extracts_demographics_and_sections():
+  """Demographics and each clinical section are pulled from a C-CDA."""
+  patient, warnings = parse_ccda(SAMPLE_CCDA, source_file="ava.xml")
+
+  assert warnings == []
+  assert (patient.name, patient.sex, patient.birth_date) == ("Ava Reyes", "female", date(2018, 4, 5))
+  assert patient.source_file == "ava.xml"
+
+  problem = patient.problems[0]
+  assert (problem.display, problem.code_system, problem.status) == ("Asthma", "SNOMED-CT", "completed")
+  assert problem.onset_date == date(2020, 3, 1)
+
+  medication = patient.medications[0]
+  assert (medication.display, medication.dose, medication.route) == ("Amoxicillin", "5 mL", "Oral")
+
+  allergy = patient.allergies[0]
+  assert (allergy.display, allergy.reaction, allergy.severity) == ("Penicillin", "Hives", "Moderate")
+
+  encounter = patient.encounters[0]
+  assert (encounter.date, encounter.type, encounter.reason) == (date(2023, 1, 15), "Office visit", "Fever")
+
+
+def test_parse_ccda_rejects_invalid_xml():
+  """Malformed uploads raise ValueError for the router to turn into a 400."""
+  with pytest.raises(ValueError):
+    parse_ccda("<ClinicalDocument")
+
+
+def test_parse_ccda_does_not_expand_entities():
+  """Entities declared in an uploaded DTD are not resolved."""
+  xml = SAMPLE_CCDA.replace(
+    '<?xml version="1.0" encoding="UTF-8"?>\n',
+    '<?xml version="1.0"?>\n<!DOCTYPE d [<!ENTITY secret SYSTEM "file:///etc/hostname">]>\n',
+  ).replace("<given>Ava</given>", "<given>&secret;</given>")
+
+  patient, _ = parse_ccda(xml)
+  assert patient.name == "Reyes"
+
+
+def test_body_sections_are_freed_once_handled():
+  """Streaming keeps only the newest section's component in the tree."""
+  context = etree.iterparse(
+    BytesIO(SAMPLE_CCDA.encode()),
+    events=("start", "end"),
+    tag=(ccda_parser.STRUCTURED_BODY_TAG, ccda_parser.SECTION_TAG),
+  )
+  seen = [len(section) for section in ccda_parser._iter_body_sections(context)]
+
+  assert len(seen) == 4 and all(seen)
+  body = context.root.find(f".//{ccda_parser.STRUCTURED_BODY_TAG}")
+  assert len(body) == 1 and len(body[0][0]) == 0
+
+
+def test_parse_hl7_date():
+  """Dates come from the first eight digits; anything invalid is None."""
+  assert ccda_parser._parse_hl7_date("20200229") == date(2020, 2, 29)
+  assert ccda_parser._parse_hl7_date("20190304120000-0500") == date(2019, 3, 4)
+  for value in ("", "2019", "20191340", "20190100", "00000101", "20190229", "2019-03-04", "abcdefgh"):
+    assert ccda_parser._parse_hl7_date(value) is None
+
+
+def test_section_kind_by_template_or_code():
+  """Template IDs and LOINC codes both route; conflicts keep the old precedence."""
+  assert ccda_parser._section_kind(["2.16.840.1.113883.10.20.22.2.22"], "") == "encounters"
+  assert ccda_parser._section_kind(["1.2.3"], "10160-0") == "medications"
+  assert ccda_parser._section_kind(["2.16.840.1.113883.10.20.22.2.1"], "11450-4") == "problems"
+  assert ccda_parser._section_kind(["1.2.3"], "29762-2") is None
+
+
+def test_repeated_codes_share_one_string():
+  """Imported patients keep one copy of each recurring code and display name."""
+  first, _ = parse_ccda(SAMPLE_CCDA)
+  second, _ = parse_ccda(SAMPLE_CCDA)
+  assert first.problems[0].display is second.problems[0].display
+  assert first.medications[0].route is second.medications[0].route
+
+
+def test_reupload_reuses_parse_as_new_record():
+  """The same document parses once; each upload still gets its own record."""
+  ccda_parser._parse_cache.clear()
+  first, _ = parse_ccda(SAMPLE_CCDA, source_file="a.xml")
+  second, warnings = parse_ccda(SAMPLE_CCDA, source_file="b.xml")
+
+  assert len(ccda_parser._parse_cache) == 1
+  assert first.id != second.id
+  assert (first.source_file, second.source_file) == ("a.xml", "b.xml")
+  assert second.problems == first.problems and second.problems is not first.problems
+  assert warnings == []
+
+
+def test_parse_ccda_accepts_uploaded_bytes_and_files():
+  """Raw upload bytes and spooled upload files parse the same as decoded text."""
+  ccda_parser._parse_cache.clear()
+  from_text, _ = parse_ccda(SAMPLE_CCDA)
+  from_bytes, _ = parse_ccda(SAMPLE_CCDA.encode())
+  assert (from_bytes.name, from_bytes.problems) == (from_text.name, from_text.problems)
+
+  ccda_parser._parse_cache.clear()
+  from_file, _ = parse_ccda(BytesIO(SAMPLE_CCDA.encode()))
+  assert (from_file.name, from_file.problems) == (from_text.name, from_text.problems)
+  assert len(ccda_parser._parse_cache) == 1
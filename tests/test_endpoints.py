@@ -7,7 +7,10 @@ JSON the Metis portal can render.
 """
 
 import os
+from datetime import date, datetime
+from types import SimpleNamespace
 from typing import AsyncIterator
+from uuid import uuid4
 from unittest.mock import AsyncMock, MagicMock, patch
 
 # Set a dummy API key BEFORE importing Echo so Settings() validates
@@ -17,11 +20,20 @@ os.environ.setdefault("ANTHROPIC_API_KEY", "test-key-not-used")
 import anthropic  # noqa: E402
 import httpx  # noqa: E402
 import pytest  # noqa: E402
+from fastapi import FastAPI, WebSocketDisconnect  # noqa: E402
 from fastapi.testclient import TestClient  # noqa: E402
 
-from src.main import app  # noqa: E402
+from src.auth.deps import get_current_user  # noqa: E402
+from src.main import app, SPAStaticFiles  # noqa: E402
+from src.patients import router as patients_router  # noqa: E402
+from src.patients.ccda_parser import parse_ccda  # noqa: E402
+from src.routers import voice as voice_router  # noqa: E402
+from src.core.responses import OrjsonResponse  # noqa: E402
 from src.core.tutor import get_tutor  # noqa: E402
+from src.core.voice_out import get_voice_out  # noqa: E402
 from src.models.feedback import QuestionResponse  # noqa: E402
+from src.config import DEFAULT_VOICE, ECHO_VOICES  # noqa: E402
+from tests.test_ccda_parser import SAMPLE_CCDA  # noqa: E402
 from src.cases.models import (  # noqa: E402
   CasePhase,
   CaseState,
@@ -227,3 +239,244 @@ def test_case_start_dynamic_smoke(client: TestClient) -> None:
   assert body["case_state"]["patient"]["condition_key"] == "asthma"
   mock_generator.generate_case.assert_awaited_once()
   mock_tutor_instance.generate_case_opening.assert_awaited_once()
+
+
+def test_spa_static_files_fall_back_to_index(tmp_path) -> None:
+  """Built files are served as-is; unknown paths get index.html for the SPA router."""
+  (tmp_path / "assets").mkdir()
+  (tmp_path / "index.html").write_text("<html></html>")
+  (tmp_path / "assets" / "app.js").write_text("console.log(1)")
+  spa = FastAPI()
+  spa.mount("/", SPAStaticFiles(directory=str(tmp_path), html=True), name="spa")
+  spa_client = TestClient(spa)
+
+  assert spa_client.get("/assets/app.js").text == "console.log(1)"
+  assert spa_client.get("/cases/123").text == "<html></html>"
+  assert spa_client.get("/").text == "<html></html>"
+  assert spa_client.post("/cases/123").status_code == 405
+
+  with pytest.raises(WebSocketDisconnect):
+    with spa_client.websocket_connect("/not-a-socket"):
+      pass
+
+
+def test_orjson_response_serializes_models_and_plain_content() -> None:
+  """Models go through pydantic's JSON serializer; dicts through orjson."""
+  canned = QuestionResponse(question="Why?", topic="dosing")
+  assert OrjsonResponse(canned).body == canned.model_dump_json().encode()
+
+  body = OrjsonResponse({"on": date(2024, 1, 2), "at": datetime(2024, 1, 2, 3, 4)}).body
+  assert body == b'{"on":"2024-01-02","at":"2024-01-02T03:04:00+00:00"}'
+
+
+def test_bulk_import_keeps_upload_order(client: TestClient) -> None:
+  """Concurrent bulk parsing still reports and stores files in upload order."""
+  user = SimpleNamespace(id=uuid4())
+  app.dependency_overrides[get_current_user] = lambda: user
+  files = [
+    ("files", ("ava.xml", SAMPLE_CCDA.encode(), "text/xml")),
+    ("files", ("notes.txt", b"hello", "text/plain")),
+    ("files", ("broken.xml", b"<ClinicalDocument", "text/xml")),
+    ("files", ("latin1.xml", "<name>Jos\u00e9</name>".encode("latin-1"), "text/xml")),
+    ("files", ("cut.xml", SAMPLE_CCDA.encode() + "\u00e9".encode()[:1], "text/xml")),
+    ("files", ("ava-again.CCDA", SAMPLE_CCDA.encode(), "text/xml")),
+  ]
+
+  resp = client.post("/patients/import/bulk", files=files)
+
+  assert resp.status_code == 200, resp.text
+  body = resp.json()
+  assert [r["filename"] for r in body["results"]] == ["ava.xml", "notes.txt", "broken.xml", "latin1.xml", "cut.xml", "ava-again.CCDA"]
+  assert [r["success"] for r in body["results"]] == [True, False, False, False, False, True]
+  assert body["results"][3]["error"] == body["results"][4]["error"] == "File must be valid UTF-8 encoded XML"
+  assert body["results"][0]["patient"]["user_id"] == str(user.id)
+  stored = patients_router._memory_patients.pop(str(user.id))
+  assert [p.source_file for p in stored.values()] == ["ava.xml", "ava-again.CCDA"]
+
+
+def test_list_patients_etag_changes_with_panel(client: TestClient) -> None:
+  """The patient list 304s until an import or delete changes the panel."""
+  user = SimpleNamespace(id=uuid4())
+  app.dependency_overrides[get_current_user] = lambda: user
+
+  etag = client.get("/patients").headers["etag"]
+  assert client.get("/patients", headers={"If-None-Match": etag}).status_code == 304
+
+  imported = client.post("/patients/import", files={"file": ("ava.xml", SAMPLE_CCDA.encode(), "text/xml")})
+  changed = client.get("/patients", headers={"If-None-Match": etag})
+  assert changed.status_code == 200
+  assert changed.json()["total_count"] == 1
+
+  client.delete(f"/patients/{imported.json()['patient']['id']}")
+  assert client.get("/patients", headers={"If-None-Match": changed.headers["etag"]}).status_code == 200
+  patients_router._memory_patients.pop(str(user.id))
+
+
+def test_import_rejects_oversized_files(client: TestClient) -> None:
+  """Files over the size cap are refused before parsing."""
+  app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=uuid4())
+  big = ("big.xml", SAMPLE_CCDA.encode(), "text/xml")
+
+  with patch.object(patients_router, "MAX_CCDA_BYTES", 100):
+    single = client.post("/patients/import", files={"file": big})
+    bulk = client.post("/patients/import/bulk", files=[("files", big)])
+
+  assert single.status_code == 413
+  assert bulk.json()["results"][0]["error"] == "File exceeds 25MB limit"
+
+
+def test_case_context_built_once_per_patient() -> None:
+  """Starting more cases from one imported patient reuses its context."""
+  patient, _ = parse_ccda(SAMPLE_CCDA)
+  patients_router._get_user_patients("user-ctx")[patient.id] = patient
+
+  context = patients_router.get_patient_context_for_case(patient.id, "user-ctx")
+  assert context["medications"] == [{"display": "Amoxicillin", "dose": "5 mL"}]
+  assert patients_router.get_patient_context_for_case(patient.id, "user-ctx") is context
+
+  patients_router._memory_patients.pop("user-ctx")
+  assert patients_router.get_patient_context_for_case(patient.id, "user-ctx") is None
+
+
+def _tts(frames):
+  """Voice output stub whose stream yields the given frames."""
+  async def stream(**kwargs):
+    for frame in frames:
+      yield frame
+
+  voice_out = MagicMock()
+  voice_out.stream = MagicMock(side_effect=stream)
+  voice_out.synthesize = AsyncMock(return_value=b"".join(frames))
+  voice_out._resolve_voice_id = lambda voice: voice or "default-voice"
+  return voice_out
+
+
+@pytest.fixture
+def tts_cache():
+  """A fresh, empty TTS cache for the voice routes."""
+  cache = voice_router.TTSCache()
+  with patch.object(voice_router, "_tts_cache", cache):
+    yield cache
+
+
+def test_speak_streams_audio_unless_buffered(client: TestClient, tts_cache) -> None:
+  """/voice/speak streams chunks; ?buffered=true sends one sized body."""
+  app.dependency_overrides[get_voice_out] = lambda: _tts([b"ID3", b"frame"])
+
+  streamed = client.post("/voice/speak", json={"text": "Why?"})
+  assert streamed.content == b"ID3frame"
+  assert "content-length" not in streamed.headers
+
+  buffered = client.post("/voice/speak?buffered=true", json={"text": "Why not?"})
+  assert buffered.content == b"ID3frame"
+  assert buffered.headers["content-length"] == "8"
+
+
+def test_speak_reports_provider_failure(client: TestClient, tts_cache) -> None:
+  """A TTS error before the first chunk is still a 500, not a broken stream."""
+  voice_out = _tts([])
+
+  async def failing(**kwargs):
+    raise RuntimeError("quota exceeded")
+    yield b""
+
+  voice_out.stream = failing
+  app.dependency_overrides[get_voice_out] = lambda: voice_out
+
+  resp = client.post("/voice/speak", json={"text": "Why?"})
+  assert resp.status_code == 500
+  assert "quota exceeded" in resp.json()["detail"]
+
+
+def test_speak_stream_reports_provider_failure(client: TestClient) -> None:
+  """/voice/speak/stream fails with a 500 before any audio is sent."""
+  voice_out = _tts([])
+
+  async def failing(**kwargs):
+    raise RuntimeError("quota exceeded")
+    yield b""
+
+  voice_out.stream = failing
+  app.dependency_overrides[get_voice_out] = lambda: voice_out
+
+  resp = client.post("/voice/speak/stream", json={"text": "Why?"})
+  assert resp.status_code == 500
+  assert "quota exceeded" in resp.json()["detail"]
+
+  app.dependency_overrides[get_voice_out] = lambda: _tts([b"ID3", b"frame"])
+  assert client.post("/voice/speak/stream", json={"text": "Why?"}).content == b"ID3frame"
+
+
+def test_speak_serves_repeated_text_from_cache(client: TestClient, tts_cache) -> None:
+  """Once a voice has said something, repeats skip the TTS provider."""
+  voice_out = _tts([b"ID3", b"frame"])
+  app.dependency_overrides[get_voice_out] = lambda: voice_out
+
+  client.post("/voice/speak", json={"text": "Why?"})
+  client.post("/voice/speak?buffered=true", json={"text": "Why?"})
+  again = client.post("/voice/speak", json={"text": "Why?"})
+  other_voice = client.post("/voice/speak", json={"text": "Why?", "voice": "matilda"})
+
+  assert again.content == other_voice.content == b"ID3frame"
+  assert voice_out.stream.call_count == 2
+  voice_out.synthesize.assert_not_awaited()
+
+
+def test_tts_cache_evicts_least_recent_over_budget() -> None:
+  """The cache stays within its byte budget, dropping the oldest clip first."""
+  cache = voice_router.TTSCache(max_entries=10, max_bytes=10)
+  a, b, c = (cache.key("v", text) for text in "abc")
+  cache.put(a, b"1234")
+  cache.put(b, b"5678")
+  cache.get(a)
+  cache.put(c, b"90ab")
+
+  assert cache.get(b) is None
+  assert cache.get(a) == b"1234" and cache.get(c) == b"90ab"
+  assert cache.total_bytes == 8
+
+
+def test_conversation_websocket_exchanges_json_text_frames(client: TestClient) -> None:
+  """The conversation socket reads and answers JSON in text frames."""
+  tutor = MagicMock()
+  tutor.ask_socratic_question = AsyncMock(return_value=QuestionResponse(question="Why?", topic="dosing"))
+
+  app.dependency_overrides[get_tutor] = lambda: tutor
+  app.dependency_overrides[get_voice_out] = lambda: _tts([])
+
+  with client.websocket_connect("/voice/conversation") as ws:
+    ws.send_text('{"type": "ping"}')
+    assert ws.receive_text() == '{"type":"pong"}'
+    ws.send_text("not json")
+    assert ws.receive_json()["message"] == "Invalid JSON format"
+    ws.send_text('{"type": "message", "text": "Is it croup?"}')
+    assert ws.receive_json() == {"type": "response", "text": "Why?", "topic": "dosing", "hint": None}
+
+
+def test_conversation_websocket_sends_audio_as_binary_frame(client: TestClient, tts_cache) -> None:
+  """Requested audio follows the JSON reply as raw MP3 bytes."""
+  tutor = MagicMock()
+  tutor.ask_socratic_question = AsyncMock(return_value=QuestionResponse(question="Why?", topic="dosing"))
+
+  app.dependency_overrides[get_tutor] = lambda: tutor
+  app.dependency_overrides[get_voice_out] = lambda: _tts([b"ID3", b"frame"])
+
+  with client.websocket_connect("/voice/conversation") as ws:
+    ws.send_text('{"type": "message", "text": "Is it croup?", "include_audio": true}')
+    assert ws.receive_json()["has_audio"] is True
+    assert ws.receive_bytes() == b"ID3frame"
+
+
+def test_list_voices(client: TestClient) -> None:
+  """Every configured voice is listed once, with the default flagged."""
+  voices = client.get("/voice/voices").json()
+  assert [v["voice_id"] for v in voices] == list(ECHO_VOICES.values())
+  assert [v["name"] for v in voices if v["is_default"]] == [DEFAULT_VOICE.capitalize()]
+
+
+def test_list_voices_honors_if_none_match(client: TestClient) -> None:
+  """A re-poll with the voice list's ETag gets an empty 304."""
+  etag = client.get("/voice/voices").headers["etag"]
+  resp = client.get("/voice/voices", headers={"If-None-Match": etag})
+  assert resp.status_code == 304
+  assert resp.content == b""
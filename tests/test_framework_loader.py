@@ -1,9 +1,17 @@
 """Test framework loader with well-child support."""
 
+from dataclasses import FrozenInstanceError
+from unittest.mock import patch
+
+import pytest
+
+from src.frameworks import loader
 from src.frameworks.loader import (
-  load_frameworks, get_framework, get_frameworks_by_category,
-  get_well_child_frameworks, get_well_child_by_age,
+  load_frameworks, get_framework, find_framework, get_frameworks_by_category,
+  get_well_child_frameworks, get_well_child_by_age, get_all_framework_keys,
+  build_case_prompt,
 )
+from src.knowledge.framework_loader import FrameworkLoader
 
 
 def test_load_includes_well_child():
@@ -39,3 +47,92 @@ def test_get_frameworks_by_category_well_child():
   """get_frameworks_by_category works for well_child."""
   wc = get_frameworks_by_category("well_child")
   assert len(wc) == 13
+
+
+def test_frameworks_loaded_once_and_shared():
+  """Both loaders share one cached dict; reload refills it in place."""
+  frameworks = load_frameworks()
+  assert load_frameworks() is frameworks is loader.FRAMEWORKS
+  knowledge = FrameworkLoader()
+  assert knowledge._frameworks is frameworks
+  assert knowledge.get_categories() == list(loader.get_category_counts())
+  assert knowledge._generation == loader.frameworks_generation()
+  assert load_frameworks(reload=True) is frameworks
+
+
+def test_find_framework_uses_lookup_index():
+  """Keys, spaced keys, topics, and aliases resolve case-insensitively."""
+  key, fw = next((k, v) for k, v in load_frameworks().items() if v.get("aliases"))
+  assert find_framework(key.replace("_", " ")) is fw
+  assert find_framework(fw["aliases"][0].upper()) is fw
+  assert find_framework(fw["topic"]) is fw
+  assert find_framework("not a real condition") is None
+
+
+def test_build_case_prompt_is_cached():
+  """Repeat prompts for the same condition and level are reused."""
+  key = get_all_framework_keys()[0]
+  assert build_case_prompt(key, "student") is build_case_prompt(key, "student")
+  assert build_case_prompt(key, "resident") != build_case_prompt(key, "student")
+
+  knowledge = FrameworkLoader()
+  assert knowledge.build_case_prompt(key) is knowledge.build_case_prompt(key)
+
+
+def test_teaching_context_uses_prefiltered_images():
+  """Placeholder images are dropped at load time without touching shared dicts."""
+  fw = {"topic": "Croup", "images": [{"url": "PLACEHOLDER"}, {"url": ""}, {"url": "https://x/y.png"}]}
+  with patch.object(loader, "load_frameworks", return_value={"croup": fw}):
+    knowledge = FrameworkLoader()
+
+  context = knowledge.get_teaching_context("croup")
+  assert context.images == [{"url": "https://x/y.png"}]
+  assert context.topic == "Croup" and context.teaching_goals == []
+  assert "_valid_images" not in fw
+  assert knowledge.get_teaching_context("missing") is None
+
+
+def test_teaching_context_is_prebuilt_and_frozen():
+  """The same immutable context object is returned on every call."""
+  knowledge = FrameworkLoader()
+  key = get_all_framework_keys()[0]
+  context = knowledge.get_teaching_context(key)
+  assert knowledge.get_teaching_context(key) is context
+  with pytest.raises(FrozenInstanceError):
+    context.topic = "changed"
+  assert not hasattr(knowledge, "__dict__")
+
+
+def test_knowledge_find_matches_find_framework():
+  """Both loaders resolve names and aliases to the same framework."""
+  knowledge = FrameworkLoader()
+  for name in ("otitis media", "Red Eye", "water warts", "not a real condition"):
+    assert knowledge.find(name) is find_framework(name)
+
+
+def test_reload_invalidates_derived_caches():
+  """Reloading (or switching specialty) rebuilds prompts and the knowledge loader."""
+  from src.knowledge import framework_loader as knowledge
+
+  key = get_all_framework_keys()[0]
+  prompt = build_case_prompt(key)
+  before = knowledge.get_frameworks()
+  assert knowledge.get_frameworks() is before
+
+  fw = {"topic": "Sepsis", "teaching_goals": ["Recognize shock"]}
+  with patch.object(loader, "_load_from_athena", return_value={"sepsis": fw}):
+    load_frameworks(specialty="internal_medicine")
+  try:
+    assert get_framework(key) is None and get_framework("sepsis") is fw
+    assert knowledge.get_frameworks() is not before
+    assert knowledge.get_teaching_context("sepsis").teaching_goals == ["Recognize shock"]
+  finally:
+    load_frameworks(specialty="pediatrics")
+  assert build_case_prompt(key) == prompt
+
+
+def test_category_counts_match_category_lists():
+  """Category counts agree with the frameworks listed per category."""
+  counts = loader.get_category_counts()
+  assert counts["well_child"] == 13
+  assert all(len(get_frameworks_by_category(c)) == n for c, n in counts.items())
@@ -1,7 +1,8 @@
 """Test Echo models."""
 
 import pytest
-from src.models import PatientContext, FeedbackRequest
+from pydantic import ValidationError
+from src.models import PatientContext, FeedbackRequest, QuestionRequest
 
 
 def test_patient_context_age_display():
@@ -45,6 +46,26 @@ def test_feedback_request_validation():
   assert request.voice_response is False
 
 
+def test_question_request_normalizes_widget_patient_once():
+  """Widget patients become one PatientContext, reused on every lookup."""
+  request = QuestionRequest(
+    patient={"patientId": "w1", "name": "Kid", "age": 4, "problemList": ["asthma"]},
+    learner_question="What next?",
+  )
+
+  patient = request.get_normalized_patient()
+  assert isinstance(patient, PatientContext)
+  assert request.get_normalized_patient() is patient
+  assert (patient.patient_id, patient.age_years) == ("w1", 4)
+  assert patient.problem_list[0].display_name == "asthma"
+
+
+def test_question_request_rejects_unrecognized_patient():
+  """A patient dict matching neither shape fails validation up front."""
+  with pytest.raises(ValidationError):
+    QuestionRequest(patient={"name": "Kid"}, learner_question="What next?")
+
+
 # ==================== WELL-CHILD MODELS ====================
 
 from src.cases.models import (
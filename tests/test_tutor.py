@@ -0,0 +1,314 @@
+"""Test tutor prompt helpers."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.cases.models import DescribeCaseState, DescribedCase
+from src.core import tutor
+from src.core.citations import Citation, CitationResult
+from src.core.cache_backend import SQLiteBackend
+from src.core.qa_cache import QACache
+from src.core.tutor import _pack_conversation, estimate_tokens
+from src.models import FeedbackRequest, PatientContext, QuestionRequest
+
+
+def test_pack_conversation_keeps_chronological_order():
+  """Packed transcript lines come back oldest-first with role labels."""
+  convo = [
+    {"role": "echo", "content": "Hi there"},
+    {"role": "user", "content": "When did the fever start?"},
+  ]
+  lines = _pack_conversation(convo)
+  assert lines == ["Echo: Hi there...", "Learner: When did the fever start?..."]
+
+
+def test_pack_conversation_respects_budget():
+  """Only the most recent messages that fit the token budget are kept."""
+  convo = [{"role": "user", "content": f"message {i} " + "x" * 150} for i in range(50)]
+  lines = _pack_conversation(convo, budget_tokens=200)
+  assert sum(estimate_tokens(line) for line in lines) <= 200
+  assert lines[-1].startswith("Learner: message 49 ")
+  assert len(lines) < 50
+
+
+def test_pack_conversation_fits_more_short_messages():
+  """Short messages pack beyond the old fixed 10-message window."""
+  convo = [{"role": "user", "content": "ok"} for _ in range(30)]
+  assert len(_pack_conversation(convo)) == 30
+
+
+async def test_case_citations_reuse_prefetched_search():
+  """Q&A citations come from the search started during the debrief."""
+  result = CitationResult(
+    query="croup",
+    citations=[Citation(title="Croup", url="https://aafp.org/x", snippet="", source="AAFP")],
+  )
+  search = MagicMock()
+  search.search = AsyncMock(return_value=result)
+
+  with patch.object(tutor, "get_citation_search", return_value=search):
+    tutor._prefetch_citations("session-prefetch", "Croup")
+    citations = await tutor._get_case_citations("session-prefetch", "Croup")
+
+  assert citations[0]["title"] == "Croup"
+  search.search.assert_awaited_once()
+  tutor._citation_prefetch.pop("session-prefetch", None)
+
+
+async def test_case_citations_fallback_search_is_reused():
+  """Without a prefetch, the first question's search serves later questions."""
+  result = CitationResult(
+    query="croup",
+    citations=[Citation(title="Croup", url="https://aafp.org/x", snippet="", source="AAFP")],
+  )
+  search = MagicMock()
+  search.search = AsyncMock(return_value=result)
+
+  with patch.object(tutor, "get_citation_search", return_value=search):
+    first = await tutor._get_case_citations("session-fallback", "Croup")
+    again = await tutor._get_case_citations("session-fallback", "Croup")
+
+  assert first == again and first[0]["title"] == "Croup"
+  search.search.assert_awaited_once()
+  tutor._citation_prefetch.pop("session-fallback", None)
+
+
+async def test_closing_http_client_drops_cached_tutor():
+  """After shutdown, get_tutor() builds a new Tutor instead of reusing a closed client."""
+  with patch.object(tutor, "Tutor", side_effect=lambda **kwargs: MagicMock()):
+    tutor.get_tutor.cache_clear()
+    before = tutor.get_tutor()
+    await tutor.close_anthropic_http_client()
+    assert tutor.get_tutor() is not before
+  tutor.get_tutor.cache_clear()
+
+
+async def test_failed_citation_prefetch_is_not_reported_unretrieved():
+  """A prefetch nobody awaits doesn't leave an unretrieved task exception."""
+  search = MagicMock()
+  search.search = AsyncMock(side_effect=RuntimeError("search down"))
+
+  with patch.object(tutor, "get_citation_search", return_value=search):
+    tutor._prefetch_citations("session-failed", "Croup")
+    task = tutor._citation_prefetch.pop("session-failed")
+    await asyncio.wait({task})
+    await asyncio.sleep(0)
+
+  assert task._log_traceback is False
+
+
+async def test_qa_cache_matches_rephrased_question():
+  """Case, punctuation, and filler-word changes still hit the cache."""
+  cache = QACache()
+  await cache.put("case-1", "Why did we pick amoxicillin?", {"answer": "First-line for AOM"})
+  assert (await cache.get("case-1", "why did we pick the amoxicillin"))["answer"] == "First-line for AOM"
+  assert await cache.get("case-1", "Why did we not pick amoxicillin?") is None
+  assert await cache.get("case-2", "Why did we pick amoxicillin?") is None
+
+
+async def test_qa_cache_keeps_word_order_and_context():
+  """Reordered questions and follow-ups after different Q&A are misses."""
+  cache = QACache()
+  await cache.put("case-1", "Switch from amoxicillin to azithromycin?", {"answer": "No"})
+  assert await cache.get("case-1", "Switch from azithromycin to amoxicillin?") is None
+
+  first = [{"question": "Why steroids?", "answer": "Airway edema"}]
+  await cache.put("case-1", "Why?", {"answer": "Dexamethasone lasts longer"}, first)
+  assert (await cache.get("case-1", "why", first))["answer"] == "Dexamethasone lasts longer"
+  assert await cache.get("case-1", "Why?") is None
+  assert await cache.get("case-1", "Why?", [{"question": "Why fluids?", "answer": "Dehydration"}]) is None
+
+
+def test_plan_citations_single_pass():
+  """Evidence requests pick the chief complaint, else a keyword topic."""
+  t = tutor.Tutor.__new__(tutor.Tutor)
+  state = DescribeCaseState(conversation=[{"role": "user", "content": "Kid had an ear ache"}])
+  assert t._plan_citations("Thanks!", state) == (False, None)
+  assert t._plan_citations("What do the guidelines say?", state) == (True, "acute otitis media treatment")
+
+  state.case = DescribedCase(chief_complaint="limp")
+  assert t._plan_citations("Any evidence here?", state) == (True, "limp")
+
+
+async def test_qa_cache_shared_through_sqlite_backend(tmp_path):
+  """A second cache (another worker) sees answers stored by the first."""
+  backend = SQLiteBackend(str(tmp_path / "cache.db"))
+  await QACache(backend=backend).put("case-1", "Why steroids?", {"answer": "Reduce airway edema"})
+
+  other_worker = QACache(backend=backend)
+  assert (await other_worker.get("case-1", "why steroids"))["answer"] == "Reduce airway edema"
+
+
+async def test_qa_cache_ignores_corrupt_and_expired_backend_rows(tmp_path):
+  """Unreadable rows are cache misses, and writes purge expired rows."""
+  backend = SQLiteBackend(str(tmp_path / "cache.db"))
+  await backend.setex("qa:v2:case-1", 60, b"not zlib")
+  assert await QACache(backend=backend).get("case-1", "Why steroids?") is None
+
+  await backend.setex("stale", -1, b"old")
+  await backend.setex("fresh", 60, b"new")
+  assert backend._execute("SELECT COUNT(*) FROM cache WHERE key = 'stale'") == (0,)
+
+
+async def test_batch_feedback_routes_results_by_custom_id():
+  """Batch results map back to input order; failed requests become None."""
+  def entry(custom_id, text=None):
+    if text is None:
+      return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="errored"))
+    message = SimpleNamespace(content=[SimpleNamespace(text=text)])
+    return SimpleNamespace(custom_id=custom_id, result=SimpleNamespace(type="succeeded", message=message))
+
+  async def results():
+    yield entry("2", '{"feedback": "Nice", "feedback_type": "praise"}')
+    yield entry("0", "Plain text reply")
+    yield entry("1")
+
+  t = tutor.Tutor.__new__(tutor.Tutor)
+  t.model = "test-model"
+  t.system_prompt = "system"
+  t.client = MagicMock()
+  t.client.messages.batches.create = AsyncMock(return_value=SimpleNamespace(id="b1", processing_status="ended"))
+  t.client.messages.batches.results = AsyncMock(return_value=results())
+
+  patient = PatientContext(patient_id="1", source="oread", name="Kid", age_years=4)
+  requests = [
+    FeedbackRequest(patient=patient, learner_action=f"action {i}", action_type="plan_item")
+    for i in range(3)
+  ]
+  responses = await t.batch_feedback(requests)
+
+  submitted = t.client.messages.batches.create.call_args.kwargs["requests"]
+  assert [r["custom_id"] for r in submitted] == ["0", "1", "2"]
+  assert responses[0].feedback == "Plain text reply"
+  assert responses[1] is None
+  assert responses[2].feedback_type == "praise"
+
+
+def _concurrency_tutor(text: str):
+  """Tutor whose create() records peak concurrency."""
+  t = tutor.Tutor.__new__(tutor.Tutor)
+  t.model = "test-model"
+  t.system_prompt = "system"
+  t.client = MagicMock()
+  t.peak = 0
+  in_flight = 0
+
+  async def create(**kwargs):
+    nonlocal in_flight
+    in_flight += 1
+    t.peak = max(t.peak, in_flight)
+    await asyncio.sleep(0.01)
+    in_flight -= 1
+    return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+  t._create = create
+  return t
+
+
+async def test_grade_cohort_bounds_concurrency():
+  """Cohort grading runs calls concurrently, capped at the request limit."""
+  t = _concurrency_tutor('{"feedback": "ok", "feedback_type": "praise"}')
+  patient = PatientContext(patient_id="1", source="oread", name="Kid", age_years=4)
+  requests = [
+    FeedbackRequest(patient=patient, learner_action=f"action {i}", action_type="plan_item")
+    for i in range(12)
+  ]
+  responses = await t.grade_cohort(requests)
+
+  assert [r.feedback for r in responses] == ["ok"] * 12
+  assert t.peak == tutor.MAX_CONCURRENT_REQUESTS
+
+
+async def test_process_turn_runs_feedback_and_question_together():
+  """Feedback and the Socratic question are in flight at the same time."""
+  t = _concurrency_tutor('{"feedback": "ok", "feedback_type": "praise", "question": "Why?", "topic": "dosing"}')
+  patient = PatientContext(patient_id="1", source="oread", name="Kid", age_years=4)
+  feedback, question = await t.process_turn(
+    FeedbackRequest(patient=patient, learner_action="amoxicillin", action_type="plan_item"),
+    QuestionRequest(patient=patient, learner_question="What dose?"),
+  )
+
+  assert feedback.feedback == "ok"
+  assert question.question == "Why?"
+  assert t.peak == 2
+
+
+async def test_stream_feedback_yields_text_then_parsed_response():
+  """Deltas stream through; JSON is parsed once from the final message."""
+  chunks = ['{"feedback": "Nice', ' job", "feedback_type": "praise"}']
+
+  async def text_stream():
+    for chunk in chunks:
+      yield chunk
+
+  stream = MagicMock()
+  stream.text_stream = text_stream()
+  stream.get_final_message = AsyncMock(
+    return_value=SimpleNamespace(content=[SimpleNamespace(text="".join(chunks))])
+  )
+  manager = MagicMock()
+  manager.__aenter__ = AsyncMock(return_value=stream)
+  manager.__aexit__ = AsyncMock(return_value=False)
+
+  t = tutor.Tutor.__new__(tutor.Tutor)
+  t.model = "test-model"
+  t.system_prompt = "system"
+  t.client = MagicMock()
+  t.client.messages.stream = MagicMock(return_value=manager)
+
+  patient = PatientContext(patient_id="1", source="oread", name="Kid", age_years=4)
+  request = FeedbackRequest(patient=patient, learner_action="amoxicillin", action_type="plan_item")
+  items = [item async for item in t.stream_feedback(request)]
+
+  assert items[:-1] == chunks
+  assert items[-1].feedback == "Nice job"
+
+
+def test_parse_json_response_handles_prose_wrapped_json():
+  """JSON surrounded by prose is still recovered, braces in strings ignored."""
+  text = 'Here is the JSON: {"feedback": "Use {braces} \\"carefully\\"", "n": {"a": 1}} Let me know!'
+  assert tutor.parse_json_response(text) == {"feedback": 'Use {braces} "carefully"', "n": {"a": 1}}
+  assert tutor.parse_json_response('```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_parse_json_response_raises_without_json():
+  """Plain prose still raises JSONDecodeError so callers fall back."""
+  with pytest.raises(json.JSONDecodeError):
+    tutor.parse_json_response("Nice job on the history!")
+
+
+def test_format_patient_context_renders_once_per_patient():
+  """Repeat calls for the same patient reuse the rendered text."""
+  patient = PatientContext(patient_id="1", source="oread", name="Kid", age_years=4)
+  with patch.object(tutor, "_render_patient_context", wraps=tutor._render_patient_context) as render:
+    first = tutor.format_patient_context(patient)
+    assert tutor.format_patient_context(patient) is first
+  render.assert_called_once()
+
+
+def test_format_patient_context_rerenders_after_field_change():
+  """Reassigning a field invalidates the rendered text."""
+  patient = PatientContext(patient_id="1", source="oread", name="Kid", age_years=4)
+  first = tutor.format_patient_context(patient)
+  patient.age_years = 6
+  second = tutor.format_patient_context(patient)
+  assert second != first and "6 years" in second
+
+
+def test_prompts_loaded_once_at_import():
+  """Prompt templates are served from memory; unknown names still raise."""
+  assert tutor.get_system_prompt() is tutor.load_prompt("system")
+  with pytest.raises(FileNotFoundError):
+    tutor.load_prompt("does_not_exist")
+
+
+def test_parse_falls_back_on_wrong_shaped_json():
+  """JSON missing required fields falls back to plain text, not a 500."""
+  t = tutor.Tutor.__new__(tutor.Tutor)
+  text = '{"hint": "Think about age"}'
+  assert t._parse_question(text).question == text
+  assert t._parse_feedback('[1, 2]').feedback_type == "suggestion"
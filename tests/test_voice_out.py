@@ -0,0 +1,115 @@
+"""Test Eleven Labs voice output helpers."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+from src.config import ECHO_VOICES
+from src.core.voice_out import (
+  _DEFAULT_VOICE_SETTINGS, VoiceOut, _sentence_gen, close_voice_out, get_voice_out,
+)
+
+
+async def _aiter(items):
+  for item in items:
+    yield item
+
+
+def _voice_out(calls):
+  """VoiceOut whose TTS stream records each request and returns its text as audio."""
+  def stream(**kwargs):
+    calls.append(kwargs)
+    return _aiter([kwargs["text"].encode(), "not-bytes"])
+
+  voice_out = VoiceOut.__new__(VoiceOut)
+  voice_out.client = MagicMock()
+  voice_out.client.text_to_speech.stream = stream
+  voice_out.model_id = "test-model"
+  voice_out.default_voice_id = "default-voice"
+  voice_out.voice_settings = _DEFAULT_VOICE_SETTINGS
+  return voice_out
+
+
+async def test_sentence_gen_splits_on_sentence_boundaries():
+  """Sentences flush as they complete; abbreviations and decimals don't split."""
+  pieces = ["Ask Dr. Lee abo", "ut the 2.5 mg dose. Why", "? Short. Then ", "the rest"]
+  sentences = [s async for s in _sentence_gen(_aiter(pieces))]
+  assert sentences == [
+    "Ask Dr. Lee about the 2.5 mg dose. ",
+    "Why? Short. ",
+    "Then the rest",
+  ]
+
+
+async def test_stream_from_text_iter_synthesizes_each_sentence():
+  """Each sentence is its own TTS request, with the prior sentence as context."""
+  calls = []
+  voice_out = _voice_out(calls)
+  pieces = ["What findings ", "made you think that? ", "Take your time."]
+
+  audio = [c async for c in voice_out.stream_from_text_iter(_aiter(pieces), voice="default-voice")]
+
+  assert audio == [b"What findings made you think that? ", b"Take your time."]
+  assert [c["previous_text"] for c in calls] == [None, "What findings made you think that? "]
+
+
+async def test_synthesize_joins_streamed_chunks():
+  """synthesize collects the same chunks stream yields."""
+  calls = []
+  voice_out = _voice_out(calls)
+  assert await voice_out.synthesize("Nice job.") == b"Nice job."
+  assert calls[0]["voice_id"] == "default-voice"
+  assert calls[0]["voice_settings"] is _DEFAULT_VOICE_SETTINGS
+  assert calls[0]["optimize_streaming_latency"] == 3
+
+
+async def test_stream_coalesces_small_chunks():
+  """The first chunk is sent as-is; later frames are merged up to the size cap."""
+  voice_out = _voice_out([])
+  frames = [b"a" * 100] + [b"b" * 1000] * 9
+  voice_out.client.text_to_speech.stream = lambda **kwargs: _aiter(frames)
+
+  chunks = [c async for c in voice_out.stream("Nice job.")]
+
+  assert chunks[0] == b"a" * 100
+  assert [len(c) for c in chunks[1:]] == [5000, 4000]
+  assert b"".join(chunks) == b"".join(frames)
+
+
+async def test_stream_flushes_buffer_when_provider_pauses():
+  """Buffered audio goes out after the coalescing window, not at the next chunk."""
+  voice_out = _voice_out([])
+  produced = []
+
+  async def frames(**kwargs):
+    yield b"a"
+    yield b"b"
+    await asyncio.sleep(0.2)
+    produced.append(b"c")
+    yield b"c"
+
+  voice_out.client.text_to_speech.stream = frames
+
+  received = [(c, list(produced)) async for c in voice_out.stream("Nice job.")]
+
+  assert received == [(b"a", []), (b"b", []), (b"c", [b"c"])]
+
+
+async def test_get_voice_out_is_a_pooled_singleton():
+  """One VoiceOut (and one HTTP pool) is shared until shutdown closes it."""
+  get_voice_out.cache_clear()
+  voice_out = get_voice_out()
+  assert get_voice_out() is voice_out
+  assert voice_out.client._client_wrapper.httpx_client.httpx_client is voice_out.http_client
+
+  await close_voice_out()
+  assert voice_out.http_client.is_closed
+  assert get_voice_out() is not voice_out
+  get_voice_out.cache_clear()
+
+
+def test_resolve_voice_id_names_ids_and_default():
+  """Names resolve case-insensitively; IDs and None pass through to the right ID."""
+  voice_out = _voice_out([])
+  assert voice_out._resolve_voice_id(None) == "default-voice"
+  assert voice_out._resolve_voice_id("Matilda") == ECHO_VOICES["matilda"]
+  assert voice_out._resolve_voice_id("CustomVoiceId") == "CustomVoiceId"